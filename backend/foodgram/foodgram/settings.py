@@ -9,6 +9,9 @@ SECRET_KEY = os.environ.get(
 
 DEBUG = os.environ.get('DEBUG', 'FALSE').upper() == 'TRUE'
 
+# Serve tags and ingredients from the in-memory catalog.
+CATALOG_CACHE = os.environ.get('CATALOG_CACHE', 'TRUE').upper() == 'TRUE'
+
 ALLOWED_HOSTS = ['*']
 
 INSTALLED_APPS = [
@@ -19,7 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'users',
-    'products',
+    'products.apps.ProductsConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -73,6 +76,7 @@ REST_FRAMEWORK = {
         'user': '100000/day',
         'anon': '10000/day',
         'low_request': '3/minute',
+        'shopping_list': '60/minute',
     }
 }
 
@@ -119,6 +123,37 @@ DATABASES = {
     }
 }
 
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'
+)
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache'))
+
+CACHES = {
+    # Responses, recipe fragments, page counts and PDFs. Past
+    # CACHE_MAX_ENTRIES the file based cache drops entries at random.
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+        },
+    },
+    # Version tokens of tables, authors, carts and the catalog. They
+    # never expire and are kept apart, so culling the default cache
+    # cannot drop them and change every ETag and fragment key at once.
+    # Set VERSION_CACHE_LOCATION with a CACHE_BACKEND that is not file
+    # based.
+    'versions': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('VERSION_CACHE_LOCATION',
+                              os.path.join(CACHE_LOCATION, 'versions')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('VERSION_CACHE_MAX_ENTRIES',
+                                         10000000)),
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -149,3 +184,25 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'backend_static')
 
 MEDIA_URL = "/backend_media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "backend_media")
+# Files only their owners may download, such as rendered shopping
+# lists. It must not be inside MEDIA_ROOT.
+PRIVATE_MEDIA_ROOT = os.environ.get(
+    'PRIVATE_MEDIA_ROOT', os.path.join(BASE_DIR, 'private_media')
+)
+
+# Largest decoded recipe image accepted, in bytes.
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_SIZE', 5 * 1024 * 1024)
+)
+# Threads per process resizing uploaded recipe images.
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+# Cache list and detail responses of recipes, tags and ingredients for
+# anonymous users. Writes invalidate them, the timeout is a safety net.
+RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'TRUE').upper() == 'TRUE'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 600))
+# Copy new recipes into the feeds of the author's followers instead of
+# reading the feed from follows. Run rebuild_feeds after turning it on.
+FEED_FANOUT = os.environ.get('FEED_FANOUT', 'FALSE').upper() == 'TRUE'
+# Recipes kept in a materialized feed. The feeds service of
+# docker-compose cuts feeds back to it every 10 minutes.
+FEED_MAX_LENGTH = int(os.environ.get('FEED_MAX_LENGTH', 500))
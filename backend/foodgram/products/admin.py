@@ -1,27 +1,37 @@
 from django.contrib import admin
 
-from .models import (FavoriteRecipe, Ingredient, Product, Recipe, ShoppingCart,
-                     Tag)
+from .models import (FavoriteRecipe, Product, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListJob, Tag)
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    fields = ('product', 'amount')
+    autocomplete_fields = ('product',)
+    extra = 1
 
 
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'author', 'name', 'get_followers')
-    filter_horizontal = ('tags', 'ingredients')
+    filter_horizontal = ('tags',)
+    inlines = (RecipeIngredientInline,)
     search_fields = ('name', 'author__username', 'tags__slug')
 
     def get_followers(self, obj):
-        return FavoriteRecipe.objects.filter(recipes=obj).count()
+        return obj.favorites_count
 
     get_followers.short_description = 'Followers'
+    get_followers.admin_order_field = 'favorites_count'
 
 
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
+    search_fields = ('name',)
 
 
-class IngredientAdmin(admin.ModelAdmin):
-    list_display = ('id', 'product', 'get_unit', 'amount')
-    search_fields = ('product__name',)
+class RecipeIngredientAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipe', 'product', 'get_unit', 'amount')
+    search_fields = ('product__name', 'recipe__name')
 
     def get_unit(self, obj):
         return obj.product.measurement_unit
@@ -35,18 +45,24 @@ class TagAdmin(admin.ModelAdmin):
 
 
 class FavoriteAdmin(admin.ModelAdmin):
-    filter_horizontal = ('recipes',)
-    list_display = ('user',)
+    list_display = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
 
 
 class ShoppingCartAdmin(admin.ModelAdmin):
-    filter_horizontal = ('cart',)
-    list_display = ('user',)
+    list_display = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+
+
+class ShoppingListJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'export_format', 'status', 'created')
+    list_filter = ('status', 'export_format')
 
 
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
 admin.site.register(Recipe, RecipeAdmin)
-admin.site.register(Ingredient, IngredientAdmin)
+admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(FavoriteRecipe, FavoriteAdmin)
+admin.site.register(ShoppingListJob, ShoppingListJobAdmin)
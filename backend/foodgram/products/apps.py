@@ -3,3 +3,19 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        from reportlab.pdfbase.ttfonts import TTFError
+
+        # Modules connecting signal receivers.
+        from . import catalog, counters, feeds, shopping_list  # noqa: F401
+        from .pdf_maker import register_fonts
+        from .versions import connect_receivers
+
+        connect_receivers()
+        try:
+            register_fonts()
+        except TTFError:
+            # Static files may not be collected yet, the font is then
+            # registered on the first render.
+            pass
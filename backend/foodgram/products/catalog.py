@@ -0,0 +1,135 @@
+from bisect import bisect_left
+from collections import Counter
+from itertools import islice
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+
+from .models import Product, Tag
+from .versions import get_version_cache
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+stats = Counter(hits=0, misses=0)
+
+_catalog = None
+_lock = Lock()
+
+
+class ProductNameIndex:
+    """
+    Sorted lowercase product names. Prefix matches are found with a
+    binary search, substring matches with a scan over the same list.
+    """
+
+    def __init__(self, products):
+        self.entries = sorted((name.lower(), pk) for pk, name in products)
+        self.names = [name for name, _ in self.entries]
+
+    def search(self, query, limit):
+        start = bisect_left(self.names, query)
+        found = []
+        for name, pk in islice(self.entries, start, None):
+            if len(found) == limit or not name.startswith(query):
+                break
+            found.append(pk)
+        for name, pk in self.entries:
+            if len(found) == limit:
+                break
+            if query in name and not name.startswith(query):
+                found.append(pk)
+        return found
+
+
+class Catalog:
+    """Snapshot of all tags and products of one catalog version."""
+
+    def __init__(self, version):
+        self.version = version
+        self.tags = {tag.id: tag for tag in Tag.objects.order_by('id')}
+        self.products = {
+            product.id: product for product in Product.objects.order_by('id')
+        }
+        self.index = ProductNameIndex(
+            (product.id, product.name) for product in self.products.values()
+        )
+
+    def search(self, query, limit):
+        return [self.products[pk] for pk in self.index.search(query, limit)]
+
+
+def get_version():
+    cache = get_version_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def get_catalog():
+    """
+    Returns the catalog of this process, reloading it when another
+    process has changed tags or products since it was loaded.
+    """
+    global _catalog
+    version = get_version()
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        stats['hits'] += 1
+        return catalog
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            stats['misses'] += 1
+            _catalog = Catalog(version)
+        else:
+            stats['hits'] += 1
+        return _catalog
+
+
+def get_stats():
+    catalog = _catalog
+    return {
+        **stats,
+        'version': catalog.version if catalog else None,
+        'tags': len(catalog.tags) if catalog else 0,
+        'products': len(catalog.products) if catalog else 0,
+    }
+
+
+def get_products_or_404(ids):
+    """Products by id, read from the catalog or with one query."""
+    ids = set(ids)
+    if settings.CATALOG_CACHE:
+        products = get_catalog().products
+        found = {pk: products[pk] for pk in ids if pk in products}
+    else:
+        found = Product.objects.in_bulk(ids)
+    if len(found) != len(ids):
+        raise Http404
+    return found
+
+
+def invalidate_catalog():
+    """
+    Changes the shared version once the transaction is committed, so
+    other processes do not reload the catalog before they can see the
+    change.
+    """
+    transaction.on_commit(
+        lambda: get_version_cache().set(CATALOG_VERSION_KEY, uuid4().hex,
+                                        None)
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def catalog_changed(**kwargs):
+    invalidate_catalog()
@@ -0,0 +1,71 @@
+import hashlib
+
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+
+from .versions import get_version_time, get_versions
+
+
+def get_validators(models, *parts):
+    """
+    ETag and last modification time of a response built from models,
+    read from their version stamps. parts are mixed into the ETag.
+    """
+    versions = get_versions(model._meta.db_table for model in models)
+    etag = hashlib.md5(repr((versions, parts)).encode()).hexdigest()
+    return etag, max(map(get_version_time, versions), default=None)
+
+
+class ConditionalGetMixin:
+    """
+    Answers list and retrieve with 304 Not Modified when the client's
+    If-None-Match or If-Modified-Since still match, before anything is
+    read or serialized. The validators come from the version stamps of
+    get_cache_models(), and of user_models for authenticated users,
+    whose flags are in the response too.
+    """
+    cache_models = ()
+    user_models = ()
+
+    def get_validator_models(self, models):
+        if self.request.user.is_authenticated:
+            return models + self.user_models
+        return models
+
+    def get_cache_models(self):
+        return self.cache_models
+
+    def get_validators(self, request):
+        return get_validators(
+            self.get_validator_models(self.get_cache_models()),
+            request.user.id
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request,
+                                             *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve, request,
+                                             *args, **kwargs)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        etag = quote_etag(etag)
+        last_modified = last_modified and int(last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        if self.user_models:
+            patch_vary_headers(response, ['Authorization'])
+        return response
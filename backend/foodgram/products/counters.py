@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Follow
+from .models import FavoriteRecipe, Recipe
+from .utils import change_count
+
+User = get_user_model()
+
+# Counter column -> (model holding it, model of the counted rows and
+# its foreign key to the first one).
+COUNTERS = {
+    'favorites_count': (Recipe, FavoriteRecipe, 'recipe'),
+    'recipes_count': (User, Recipe, 'author'),
+    'followers_count': (User, Follow, 'author'),
+}
+
+
+def get_actual_count(counted_model, field):
+    """Number of counted rows pointing at the outer row."""
+    return Coalesce(Subquery(
+        counted_model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def reconcile(counter, dry_run=False):
+    """
+    Sets the counter column to the number of rows it counts wherever
+    they have drifted apart. Returns how many rows were off.
+    """
+    model, counted_model, field = COUNTERS[counter]
+    actual = get_actual_count(counted_model, field)
+    drifted = model.objects.exclude(**{counter: actual})
+    if dry_run:
+        return drifted.count()
+    return drifted.update(**{counter: actual})
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_count(User.objects.filter(id=instance.author_id),
+                     'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_count(User.objects.filter(id=instance.author_id),
+                 'recipes_count', -1)
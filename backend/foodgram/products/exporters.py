@@ -0,0 +1,39 @@
+import csv
+import json
+
+CSV_HEADER = ('name', 'measurement_unit', 'amount')
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_text(shopping_list):
+    for number, item in enumerate(shopping_list, start=1):
+        yield (f'{number}) {item.name} ({item.measurement_unit}) — '
+               f'{item.amount}\n')
+
+
+def iter_csv(shopping_list):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in shopping_list:
+        yield writer.writerow(item)
+
+
+def iter_json(shopping_list):
+    yield '['
+    for index, item in enumerate(shopping_list):
+        separator = ',' if index else ''
+        yield separator + json.dumps(item._asdict(), ensure_ascii=False)
+    yield ']'
+
+
+EXPORTERS = {
+    'txt': iter_text,
+    'csv': iter_csv,
+    'json': iter_json,
+}
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from users.models import Follow
+from .models import FeedEntry, Recipe
+
+User = get_user_model()
+
+
+def pull_feed(queryset, user):
+    """Recipes of the authors the user follows, read from follows."""
+    return queryset.filter(
+        author__in=Follow.objects.filter(user=user).values('author')
+    )
+
+
+def push_feed(queryset, user):
+    """Recipes copied into the user's feed by fan_out."""
+    return queryset.filter(feed_entries__user=user)
+
+
+def filter_feed(queryset, user):
+    if settings.FEED_FANOUT:
+        return push_feed(queryset, user)
+    return pull_feed(queryset, user)
+
+
+def latest_recipe_ids(authors):
+    return Recipe.objects.filter(author__in=authors).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', flat=True)[:settings.FEED_MAX_LENGTH]
+
+
+def fill_feed(user, authors):
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user=user, recipe_id=pk)
+         for pk in latest_recipe_ids(authors)],
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(recipe):
+    """Adds the recipe to the feed of every follower of its author."""
+    # One INSERT ... SELECT, so the followers are never loaded however
+    # many there are.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} (user_id, recipe_id) '
+            f'SELECT user_id, %s FROM {Follow._meta.db_table} '
+            f'WHERE author_id = %s',
+            [recipe.id, recipe.author_id],
+        )
+
+
+def follow_author(user, author):
+    if settings.FEED_FANOUT:
+        fill_feed(user, [author])
+
+
+def unfollow_author(user, author):
+    if settings.FEED_FANOUT:
+        FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def trim_feed(user):
+    """Keeps only the newest FEED_MAX_LENGTH entries of the feed."""
+    entries = FeedEntry.objects.filter(user=user)
+    kept = entries.order_by('-recipe__pub_date', '-recipe_id').values_list(
+        'id', flat=True
+    )[:settings.FEED_MAX_LENGTH]
+    entries.exclude(id__in=list(kept)).delete()
+
+
+def trim_feeds():
+    """
+    Trims every feed that has grown past FEED_MAX_LENGTH. fan_out only
+    adds, so this runs periodically (rebuild_feeds --trim --interval).
+    """
+    users = FeedEntry.objects.values('user').annotate(
+        entries=Count('id')
+    ).filter(entries__gt=settings.FEED_MAX_LENGTH).values_list(
+        'user', flat=True
+    )
+    for user_id in users:
+        trim_feed(User(id=user_id))
+    return len(users)
+
+
+def rebuild_feed(user):
+    with transaction.atomic():
+        FeedEntry.objects.filter(user=user).delete()
+        fill_feed(user, Follow.objects.filter(user=user).values('author'))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created and settings.FEED_FANOUT:
+        fan_out(instance)
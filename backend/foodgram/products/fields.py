@@ -0,0 +1,91 @@
+import binascii
+from base64 import b64decode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.template.defaultfilters import filesizeformat
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+BASE64_SEPARATOR = ';base64,'
+# Multiple of 4, so every chunk decodes on its own.
+BASE64_CHUNK_SIZE = 256 * 1024
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+class RecipeImageField(Base64ImageField):
+    """
+    Base64 image decoded chunk by chunk straight into a temporary file,
+    which the storage then moves into place. Only the image header is
+    parsed to check the format.
+    """
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size}.',
+    }
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        start = data.find(BASE64_SEPARATOR)
+        start = 0 if start == -1 else start + len(BASE64_SEPARATOR)
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if (len(data) - start) * 3 // 4 > max_size:
+            self.fail('too_large', max_size=filesizeformat(max_size))
+        file = TemporaryUploadedFile('image', None, 0, None)
+        try:
+            self.decode(data, start, file)
+            if file.size > max_size:
+                self.fail('too_large', max_size=filesizeformat(max_size))
+            file.name = f'{uuid4()}.{self.get_extension(file)}'
+        except Exception:
+            file.close()
+            raise
+        return serializers.FileField.to_internal_value(self, file)
+
+    def decode(self, data, start, file):
+        rest = ''
+        for position in range(start, len(data), BASE64_CHUNK_SIZE):
+            chunk = rest + ''.join(
+                data[position:position + BASE64_CHUNK_SIZE].split()
+            )
+            end = len(chunk) - len(chunk) % 4
+            chunk, rest = chunk[:end], chunk[end:]
+            try:
+                file.write(b64decode(chunk, validate=True))
+            except binascii.Error:
+                raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        if rest:
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        file.size = file.tell()
+        file.seek(0)
+
+    def get_extension(self, file):
+        try:
+            with Image.open(file) as image:
+                image_format = image.format
+        except (Image.DecompressionBombError, OSError, ValueError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        file.seek(0)
+        if image_format not in IMAGE_FORMATS:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        return IMAGE_FORMATS[image_format]
+
+
+class ResizedImageField(serializers.ImageField):
+    """URL of a generated image size, or of the original until it exists."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return super().get_attribute(instance) or instance.image
@@ -1,53 +1,83 @@
 import django_filters
+from django.db.models import Exists, OuterRef
+from django_filters.widgets import BooleanWidget
 
 from .models import FavoriteRecipe, Product, Recipe, ShoppingCart, Tag
+from .search import search_products
 
 
 class RecipesFilter(django_filters.FilterSet):
+    """
+    Every filter is an EXISTS subquery, so recipes are never joined to
+    their tags, favorites or carts and need no DISTINCT.
+    """
+    POPULAR = 'popular'
+    ORDERINGS = {
+        # Served by recipe_popular_idx read backwards.
+        POPULAR: ('-favorites_count', '-pub_date', '-id'),
+    }
+
     tags = django_filters.filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name='slug',
         queryset=Tag.objects.all(),
+        method='filter_tags',
     )
     author = django_filters.NumberFilter(
         field_name='author__id'
     )
     is_favorited = django_filters.BooleanFilter(
-        field_name='favorite_recipe__recipes',
+        widget=BooleanWidget,
         method='filter_is_favorited',
     )
     is_in_shopping_cart = django_filters.BooleanFilter(
-        field_name='cart__cart',
+        widget=BooleanWidget,
         method='filter_is_in_shopping_cart',
     )
+    ordering = django_filters.ChoiceFilter(
+        choices=[(POPULAR, 'Популярные')],
+        method='filter_ordering',
+    )
 
-    def filter_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if user.is_anonymous:
-            return queryset.none()
-        shopping_cart, created = ShoppingCart.objects.get_or_create(user=user)
-        user_recipes_id = shopping_cart.cart.values_list('id', flat=True)
-        return queryset.filter(id__in=user_recipes_id)
+    def filter_tags(self, queryset, name, value):
+        # The field cleans a missing parameter to an empty queryset.
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=value
+        )))
 
     def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, FavoriteRecipe, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, ShoppingCart, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
+
+    def filter_user_recipes(self, queryset, model, value):
         user = self.request.user
         if user.is_anonymous:
-            return queryset.none()
-        user_recipes, created = FavoriteRecipe.objects.get_or_create(user=user)
-        user_recipes_id = user_recipes.recipes.values_list('id', flat=True)
-        return queryset.filter(id__in=user_recipes_id)
+            return queryset.none() if value else queryset
+        exists = Exists(model.objects.filter(user=user, recipe=OuterRef('pk')))
+        return queryset.filter(exists if value else ~exists)
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'ordering']
 
 
 class IngredientFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(
         field_name='name',
-        lookup_expr='contains'
+        method='filter_name',
     )
 
+    def filter_name(self, queryset, name, value):
+        return search_products(queryset, value)
+
     class Meta:
         model = Product
         fields = ['name']
@@ -0,0 +1,103 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404
+from rest_framework.response import Response
+
+from .models import Product, Recipe, Tag
+from .response_cache import stats
+from .serializers import RecipeListSerializer
+from .versions import get_author_versions, get_versions
+
+FRAGMENT_KEY = 'recipe_fragment:{id}:{digest}'
+
+# Tables every fragment reads besides the rows of its own recipe. The
+# author is versioned on their own, see get_author_versions.
+SHARED_MODELS = (Tag, Product)
+
+
+def get_fragment_keys(request, recipes):
+    shared = get_versions(model._meta.db_table for model in SHARED_MODELS)
+    authors = get_author_versions({recipe.author_id for recipe in recipes})
+    host = request.build_absolute_uri('/')
+    return {
+        recipe.id: FRAGMENT_KEY.format(id=recipe.id, digest=hashlib.md5(
+            repr((host, recipe.updated_at, shared,
+                  authors[recipe.author_id])).encode()
+        ).hexdigest())
+        for recipe in recipes
+    }
+
+
+def serialize_recipes(request, ids):
+    recipes = Recipe.objects.filter(id__in=ids).with_related()
+    return {
+        data['id']: data for data in RecipeListSerializer(
+            recipes.with_user_flags(AnonymousUser()), many=True,
+            context={'request': request}
+        ).data
+    }
+
+
+def get_fragments(request, recipes):
+    """
+    The representation of every recipe without the per-user flags.
+    Only recipes missing from the cache are read and serialized.
+    """
+    if not settings.RESPONSE_CACHE:
+        return serialize_recipes(request, [recipe.id for recipe in recipes])
+    keys = get_fragment_keys(request, recipes)
+    cached = cache.get_many(keys.values())
+    fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = keys.keys() - fragments.keys()
+    stats['fragment_hits'] += len(fragments)
+    stats['fragment_misses'] += len(missing)
+    if missing:
+        serialized = serialize_recipes(request, missing)
+        cache.set_many({keys[pk]: data for pk, data in serialized.items()},
+                       settings.RESPONSE_CACHE_TIMEOUT)
+        fragments.update(serialized)
+    return fragments
+
+
+def add_user_flags(fragment, recipe, user):
+    """Lays the flags annotated by with_user_flags over a fragment."""
+    data = fragment.copy()
+    data['is_favorited'] = recipe.is_favorited
+    data['is_in_shopping_cart'] = recipe.is_in_shopping_cart
+    data['author'] = fragment['author'].copy()
+    data['author']['is_subscribed'] = (recipe.is_author_subscribed
+                                       or recipe.author_id == user.id)
+    return data
+
+
+class RecipeFragmentMixin:
+    """
+    Builds list and retrieve responses from cached recipe fragments.
+    get_queryset has to annotate the user's flags with with_user_flags
+    and read author_id and updated_at, the other fields of the recipes
+    are not used.
+    """
+
+    def get_recipes_data(self, recipes):
+        fragments = get_fragments(self.request, recipes)
+        # Recipes deleted since the page was read have no fragment.
+        return [
+            add_user_flags(fragments[recipe.id], recipe, self.request.user)
+            for recipe in recipes if recipe.id in fragments
+        ]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_recipes_data(page))
+        return Response(self.get_recipes_data(list(queryset)))
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_recipes_data([self.get_object()])
+        if not data:
+            raise Http404
+        return Response(data[0])
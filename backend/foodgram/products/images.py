@@ -0,0 +1,113 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .models import Recipe
+from .versions import bump_versions
+
+logger = logging.getLogger(__name__)
+
+# Recipe field -> width of the image stored in it. The uploaded
+# original stays in Recipe.image.
+IMAGE_SIZES = {
+    'thumbnail': 480,
+    'detail_image': 1280,
+}
+if features.check('webp'):
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'WEBP', 'webp'
+else:
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'JPEG', 'jpg'
+IMAGE_QUALITY = 80
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS,
+                                       thread_name_prefix='recipe-images')
+        return _pool
+
+
+def resize(image, width):
+    resized = image.copy()
+    resized.thumbnail((width, width * 4), Image.LANCZOS)
+    output = BytesIO()
+    resized.save(output, IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    return ContentFile(output.getvalue())
+
+
+def generate_images(recipe_id):
+    """
+    Stores every size of the recipe image. The names are written only
+    if the image has not been replaced in the meantime.
+    """
+    recipe = Recipe.objects.filter(id=recipe_id).only(
+        'id', 'image', *IMAGE_SIZES
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    names = {}
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        mode = 'RGBA' if IMAGE_FORMAT == 'WEBP' else 'RGB'
+        if image.mode not in ('RGB', mode):
+            image = image.convert(mode)
+        for field_name, width in IMAGE_SIZES.items():
+            field = Recipe._meta.get_field(field_name)
+            names[field_name] = default_storage.save(
+                field.generate_filename(
+                    recipe, f'{uuid4().hex}.{IMAGE_EXTENSION}'
+                ),
+                resize(image, width),
+            )
+    updated = Recipe.objects.filter(
+        id=recipe.id, image=recipe.image.name
+    ).update(updated_at=timezone.now(), **names)
+    if updated:
+        bump_versions(Recipe)
+        stale = [getattr(recipe, field).name for field in IMAGE_SIZES]
+    else:
+        stale = names.values()
+    for name in stale:
+        if name:
+            default_storage.delete(name)
+
+
+def process_images(recipe_id):
+    try:
+        generate_images(recipe_id)
+    except Exception:
+        logger.exception('Images of recipe %s were not generated', recipe_id)
+    finally:
+        connection.close()
+
+
+def refresh_images(recipe):
+    """
+    Forgets the sizes made from the previous image and queues new ones
+    once the transaction is committed. Call before saving the recipe.
+    """
+    stale = [getattr(recipe, field).name
+             for field in IMAGE_SIZES if getattr(recipe, field)]
+    for field in IMAGE_SIZES:
+        setattr(recipe, field, '')
+
+    def queue():
+        for name in stale:
+            default_storage.delete(name)
+        get_pool().submit(process_images, recipe.id)
+
+    transaction.on_commit(queue)
@@ -0,0 +1,101 @@
+import logging
+from datetime import timedelta
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.core.files import File
+from django.utils import timezone
+
+from .exporters import EXPORTERS
+from .models import ShoppingListJob
+from .pdf_maker import create_pdf
+from .shopping_list import (get_cart_version, get_shopping_list,
+                            iter_shopping_list)
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL = timedelta(days=1)
+# Running jobs older than this were left behind by a worker that died.
+JOB_TIMEOUT = timedelta(minutes=10)
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def create_job(user, export_format):
+    """
+    Queues a render of the user's shopping list, reusing a job made for
+    the same cart contents and format when there is one.
+    """
+    cart_version = get_cart_version(user)
+    job = ShoppingListJob.objects.filter(
+        user=user, export_format=export_format, cart_version=cart_version
+    ).exclude(status=ShoppingListJob.FAILED).exclude(
+        status=ShoppingListJob.RUNNING,
+        claimed__lt=timezone.now() - JOB_TIMEOUT,
+    ).first()
+    if job is None:
+        job = ShoppingListJob.objects.create(
+            user=user, export_format=export_format, cart_version=cart_version
+        )
+    return job
+
+
+def claim_job():
+    """
+    Marks the oldest pending job as running and returns it. The status
+    is switched with a conditional UPDATE, so concurrent workers never
+    get the same job.
+    """
+    pending = ShoppingListJob.objects.filter(status=ShoppingListJob.PENDING)
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        claimed = ShoppingListJob.objects.filter(
+            id=job_id, status=ShoppingListJob.PENDING
+        ).update(status=ShoppingListJob.RUNNING, progress=10,
+                 claimed=timezone.now())
+        if claimed:
+            return ShoppingListJob.objects.select_related('user').get(
+                id=job_id
+            )
+    return None
+
+
+def render_shopping_list(user, export_format, output):
+    if export_format == 'pdf':
+        create_pdf(get_shopping_list(user), output)
+        return
+    for chunk in EXPORTERS[export_format](iter_shopping_list(user)):
+        output.write(chunk.encode())
+
+
+def run_job(job):
+    try:
+        with SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as output:
+            render_shopping_list(job.user, job.export_format, output)
+            ShoppingListJob.objects.filter(id=job.id).update(progress=80)
+            job.file.save(f'{uuid4().hex}.{job.export_format}',
+                          File(output), save=False)
+    except Exception as error:
+        logger.exception('Shopping list job %s failed', job.id)
+        job.status = ShoppingListJob.FAILED
+        job.error = str(error)[:255]
+    else:
+        job.status = ShoppingListJob.DONE
+        job.progress = 100
+    job.save()
+
+
+def fail_stale_jobs():
+    """Fails the jobs a crashed or restarted worker left running."""
+    return ShoppingListJob.objects.filter(
+        status=ShoppingListJob.RUNNING,
+        claimed__lt=timezone.now() - JOB_TIMEOUT,
+    ).update(status=ShoppingListJob.FAILED,
+             error='Обработка прервана, запросите список ещё раз')
+
+
+def delete_expired_jobs():
+    expired = ShoppingListJob.objects.filter(
+        created__lt=timezone.now() - JOB_TTL
+    ).exclude(status=ShoppingListJob.RUNNING)
+    for job in expired:
+        job.file.delete(save=False)
+        job.delete()
@@ -0,0 +1,119 @@
+import statistics
+import time
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products.feeds import fan_out, pull_feed, push_feed, rebuild_feed
+from products.models import FeedEntry, Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+
+def measure(function, repeat):
+    """Median run time of function in milliseconds."""
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+class Command(BaseCommand):
+    help = ('Compares reading the feed from follows (pull) with reading '
+            'it from fanned-out entries (push). The synthetic users, '
+            'recipes and follows are created in a transaction that is '
+            'rolled back at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follows', type=int, nargs='+',
+                            default=[10, 1000, 100000],
+                            help='Numbers of followed authors to measure.')
+        parser.add_argument('--recipes-per-author', type=int, default=3)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Runs per measurement, the median is '
+                                 'reported.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def create_users(self, count):
+        prefix = f'feed-benchmark-{uuid4().hex[:8]}'
+        User.objects.bulk_create([
+            User(username=f'{prefix}-{number}',
+                 email=f'{prefix}-{number}@example.com')
+            for number in range(count)
+        ])
+        return list(User.objects.filter(
+            username__startswith=prefix
+        ).order_by('id').values_list('id', flat=True))
+
+    def run(self, options):
+        follows = sorted(options['follows'])
+        reader, *authors = self.create_users(follows[-1] + 1)
+        Recipe.objects.bulk_create([
+            Recipe(author_id=author, name='benchmark',
+                   image='images/benchmark.png', text='benchmark',
+                   cooking_time=1)
+            for author in authors
+            for _ in range(options['recipes_per_author'])
+        ])
+        popular = authors[-1]
+        recipes = Recipe.objects.only('id', 'author_id', 'pub_date')
+        size = options['page_size']
+        reader = User(id=reader)
+        self.stdout.write(f'Database: {connection.vendor}')
+        self.stdout.write('follows | pull read ms | push read ms | '
+                          'fan-out ms | rebuild feed ms')
+        followed = 0
+        for count in follows:
+            # The reader follows count authors and count users follow
+            # the popular author.
+            Follow.objects.bulk_create([
+                Follow(user=reader, author_id=author)
+                for author in authors[followed:count]
+            ])
+            Follow.objects.bulk_create([
+                Follow(user_id=user, author_id=popular)
+                for user in authors[followed:count] if user != popular
+            ])
+            followed = count
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            pull = measure(
+                lambda: list(pull_feed(recipes, reader).order_by(
+                    '-pub_date', '-id'
+                )[:size]),
+                options['repeat']
+            )
+            start = time.perf_counter()
+            rebuild_feed(reader)
+            rebuild = (time.perf_counter() - start) * 1000
+            push = measure(
+                lambda: list(push_feed(recipes, reader).order_by(
+                    '-pub_date', '-id'
+                )[:size]),
+                options['repeat']
+            )
+            recipe = Recipe.objects.create(
+                author_id=popular, name='benchmark',
+                image='images/benchmark.png', text='benchmark',
+                cooking_time=1,
+            )
+            # With FEED_FANOUT on, saving has fanned it out already.
+            FeedEntry.objects.filter(recipe=recipe).delete()
+            start = time.perf_counter()
+            fan_out(recipe)
+            fan_out_time = (time.perf_counter() - start) * 1000
+            FeedEntry.objects.filter(recipe=recipe).delete()
+            recipe.delete()
+            self.stdout.write(f'{count} | {pull:.2f} | {push:.2f} | '
+                              f'{fan_out_time:.1f} | {rebuild:.1f}')
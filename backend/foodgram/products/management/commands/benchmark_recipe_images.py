@@ -0,0 +1,63 @@
+import math
+import os
+import time
+import tracemalloc
+from base64 import b64encode
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+
+from products.fields import RecipeImageField
+
+MEGABYTE = 1000 * 1000
+
+
+def get_payload(size):
+    """Data URI of an uncompressed random-noise PNG of about size bytes."""
+    side = int(math.sqrt(size // 3))
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    output = BytesIO()
+    image.save(output, 'PNG', compress_level=0)
+    return 'data:image/png;base64,' + b64encode(output.getvalue()).decode()
+
+
+def decode(field, payload):
+    """Peak traced MiB and milliseconds of one to_internal_value."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    file = field.to_internal_value(payload)
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    file.close()
+    return peak / 1024 / 1024, elapsed
+
+
+class Command(BaseCommand):
+    help = ('Compares peak traced memory and time of decoding recipe '
+            'images with Base64ImageField and RecipeImageField. The '
+            'payload string itself is allocated before tracing starts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[1, 5, 20],
+                            help='Image sizes in megabytes.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('MB | Base64ImageField MiB | ms | '
+                          'RecipeImageField MiB | ms')
+        with override_settings(
+                RECIPE_IMAGE_MAX_SIZE=max(options['sizes']) * 2 * MEGABYTE):
+            # Pillow loads its format plugins on the first decode.
+            decode(Base64ImageField(), get_payload(1000))
+            for size in options['sizes']:
+                payload = get_payload(size * MEGABYTE)
+                base_peak, base_time = decode(Base64ImageField(), payload)
+                peak, elapsed = decode(RecipeImageField(), payload)
+                self.stdout.write(
+                    f'{size} | {base_peak:.1f} | {base_time:.0f} | '
+                    f'{peak:.1f} | {elapsed:.0f}'
+                )
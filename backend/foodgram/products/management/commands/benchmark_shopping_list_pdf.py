@@ -0,0 +1,61 @@
+import re
+import time
+import tracemalloc
+from tempfile import SpooledTemporaryFile
+
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.pdf_maker import ShoppingListRenderer
+from products.shopping_list import PDF_CACHE_MAX_SIZE, ShoppingListItem
+
+PAGE_OBJECT = re.compile(rb'/Type /Page\b')
+
+
+def get_shopping_list(lines):
+    units = [unit for unit, _ in Product.UNITS_CHOICES]
+    return [
+        ShoppingListItem(f'продукт {number}', units[number % len(units)],
+                         number % 1000 + 1)
+        for number in range(lines)
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Renders synthetic shopping lists into PDF the way the '
+            'download does and reports time, pages, size and peak '
+            'traced memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+',
+                            default=[10, 1000, 10000],
+                            help='Shopping list lengths to render.')
+
+    def handle(self, *args, **options):
+        renderer = ShoppingListRenderer()
+        # Fonts are registered once per process, keep that out.
+        with SpooledTemporaryFile() as output:
+            renderer.render(get_shopping_list(1), output)
+        self.stdout.write('lines | ms | layout ms | serialization ms | '
+                          'pages | KiB | peak MiB')
+        for lines in options['lines']:
+            shopping_list = get_shopping_list(lines)
+            with SpooledTemporaryFile(max_size=PDF_CACHE_MAX_SIZE) as output:
+                start = time.perf_counter()
+                renderer.render(shopping_list, output)
+                total = (time.perf_counter() - start) * 1000
+                size = output.tell()
+                output.seek(0)
+                pages = len(PAGE_OBJECT.findall(output.read()))
+            timings = renderer.timings
+            # Traced separately, tracing slows rendering down.
+            with SpooledTemporaryFile(max_size=PDF_CACHE_MAX_SIZE) as output:
+                tracemalloc.start()
+                renderer.render(shopping_list, output)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            self.stdout.write(
+                f'{lines} | {total:.0f} | {timings["layout"] * 1000:.0f} | '
+                f'{timings["serialization"] * 1000:.0f} | {pages} | '
+                f'{size / 1024:.0f} | {peak / 1024 / 1024:.1f}'
+            )
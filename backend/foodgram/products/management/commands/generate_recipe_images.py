@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from products.images import process_images
+from products.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generates resized images of recipes that have none yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of resizing threads.')
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate images of every recipe.')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(thumbnail='')
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for _ in pool.map(process_images, recipe_ids):
+                pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed images of {len(recipe_ids)} recipes.'
+        ))
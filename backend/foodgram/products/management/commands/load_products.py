@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products import units
+from products.catalog import invalidate_catalog
+from products.models import Product
+from products.versions import bump_versions
+
+CHUNK_SIZE = 64 * 1024
+NAME_LENGTH = Product._meta.get_field('name').max_length
+UNIT_LENGTH = Product._meta.get_field('measurement_unit').max_length
+
+
+def iter_json(file):
+    """
+    Yields the items of a top-level JSON array while reading the file
+    in chunks, so the whole document is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            if buffer[0] != '[':
+                raise CommandError('Expected a JSON array of products.')
+            buffer = buffer[1:]
+            started = True
+            continue
+        if started and buffer[:1] in (',', ']'):
+            if buffer[0] == ']':
+                return
+            buffer = buffer[1:]
+            continue
+        if started and buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise CommandError('Malformed JSON file.')
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+        if eof:
+            raise CommandError('Unexpected end of the JSON file.')
+        chunk = file.read(CHUNK_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_csv(file):
+    """Yields products of a name,measurement_unit CSV, header optional."""
+    for row in csv.reader(file):
+        if not row or row == ['name', 'measurement_unit']:
+            continue
+        yield {'name': row[0], 'measurement_unit': row[1] if len(row) > 1
+               else ''}
+
+
+READERS = {
+    'json': iter_json,
+    'csv': iter_csv,
+}
+
+
+class Command(BaseCommand):
+    help = 'Loads products from a JSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the products file.')
+        parser.add_argument('--format', choices=READERS,
+                            help='File format, taken from the extension '
+                                 'by default.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Products inserted per query.')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Also refresh the base unit of products '
+                                 'that already exist.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (options['format']
+                       or os.path.splitext(path)[1].lstrip('.').lower())
+        if file_format not in READERS:
+            raise CommandError(f'Unknown file format: {file_format}.')
+        self.batch_size = options['batch_size']
+        self.upsert = options['upsert']
+        self.stats = dict.fromkeys(
+            ['read', 'duplicates', 'invalid', 'updated'], 0
+        )
+        start = time.perf_counter()
+        count_before = Product.objects.count()
+        with open(path, encoding='utf-8', newline='') as file, \
+                transaction.atomic():
+            self.load(READERS[file_format](file))
+            # bulk_create sends no signals.
+            invalidate_catalog()
+            bump_versions(Product)
+        elapsed = time.perf_counter() - start
+        created = Product.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            'Read {read}, created {created}, updated {updated}, skipped '
+            '{duplicates} duplicates and {invalid} invalid rows in '
+            '{elapsed:.2f}s ({rate:.0f} rows/s).'.format(
+                **self.stats, created=created, elapsed=elapsed,
+                rate=self.stats['read'] / elapsed if elapsed else 0,
+            )
+        ))
+
+    def load(self, items):
+        seen = set()
+        batch = []
+        for item in items:
+            self.stats['read'] += 1
+            name = str(item.get('name') or '').strip()
+            unit = str(item.get('measurement_unit') or '').strip()
+            if (not name or not unit or len(name) > NAME_LENGTH
+                    or len(unit) > UNIT_LENGTH):
+                self.stats['invalid'] += 1
+                continue
+            if (name, unit) in seen:
+                self.stats['duplicates'] += 1
+                continue
+            seen.add((name, unit))
+            batch.append(Product(name=name, measurement_unit=unit,
+                                 base_unit=units.base_unit(unit)))
+            if len(batch) == self.batch_size:
+                self.save_batch(batch)
+                batch = []
+        if batch:
+            self.save_batch(batch)
+
+    def save_batch(self, batch):
+        if self.upsert:
+            self.update_existing(batch)
+        Product.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def update_existing(self, batch):
+        """
+        Name and unit are the whole natural key, so only the derived
+        base unit can be stale. Saving the product also recalculates
+        the base amounts of its ingredients.
+        """
+        base_units = {(product.name, product.measurement_unit):
+                      product.base_unit for product in batch}
+        existing = Product.objects.filter(
+            name__in={product.name for product in batch}
+        )
+        for product in existing:
+            base_unit = base_units.get(
+                (product.name, product.measurement_unit)
+            )
+            if base_unit is not None and base_unit != product.base_unit:
+                product.save()
+                self.stats['updated'] += 1
@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from products.jobs import (claim_job, delete_expired_jobs, fail_stale_jobs,
+                           run_job)
+
+
+def run_in_thread(job):
+    try:
+        run_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Renders queued shopping list documents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Number of rendering threads.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        poll_interval = options['poll_interval']
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = set()
+            while True:
+                close_old_connections()
+                fail_stale_jobs()
+                while len(running) < workers:
+                    job = claim_job()
+                    if job is None:
+                        break
+                    running.add(pool.submit(run_in_thread, job))
+                if running:
+                    _, running = wait(running, timeout=poll_interval,
+                                      return_when=FIRST_COMPLETED)
+                    continue
+                if options['once']:
+                    break
+                delete_expired_jobs()
+                time.sleep(poll_interval)
@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from products.feeds import rebuild_feed, trim_feeds
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Refills the materialized feeds from follows, or with --trim '
+            'only cuts them back to FEED_MAX_LENGTH.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trim', action='store_true',
+                            help='Only trim the feeds that grew too long.')
+        parser.add_argument('--interval', type=float,
+                            help='With --trim, keep trimming every that '
+                                 'many seconds instead of exiting.')
+
+    def handle(self, *args, **options):
+        if options['trim']:
+            while True:
+                close_old_connections()
+                trimmed = trim_feeds()
+                self.stdout.write(self.style.SUCCESS(
+                    f'{trimmed} feeds trimmed.'
+                ))
+                if not options['interval']:
+                    return
+                time.sleep(options['interval'])
+        users = User.objects.filter(follower__isnull=False).distinct()
+        for user in users.iterator():
+            rebuild_feed(user)
+        self.stdout.write(self.style.SUCCESS(
+            f'{users.count()} feeds rebuilt.'
+        ))
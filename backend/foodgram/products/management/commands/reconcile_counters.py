@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from products.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = ('Repairs favorites_count, recipes_count and followers_count '
+            'that have drifted from the rows they count.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--counter', action='append', dest='counters',
+                            choices=list(COUNTERS),
+                            help='Counter to check, all by default. '
+                                 'Can be repeated.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows have drifted.')
+
+    def handle(self, *args, **options):
+        for counter in options['counters'] or COUNTERS:
+            drifted = reconcile(counter, dry_run=options['dry_run'])
+            verb = 'drifted' if options['dry_run'] else 'repaired'
+            self.stdout.write(self.style.SUCCESS(
+                f'{counter}: {drifted} rows {verb}.'
+            ))
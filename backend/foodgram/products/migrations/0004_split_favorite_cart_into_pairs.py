@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+CONTAINERS = (
+    ('FavoriteRecipe', 'recipes', 'favoriterecipe'),
+    ('ShoppingCart', 'cart', 'shoppingcart'),
+)
+
+
+def split_into_pairs(apps, schema_editor):
+    for model_name, field_name, through_field in CONTAINERS:
+        model = apps.get_model('products', model_name)
+        through = model._meta.get_field(field_name).remote_field.through
+        pairs = set(through.objects.values_list(
+            f'{through_field}__user', 'recipe'
+        ))
+        model.objects.all().delete()
+        model.objects.bulk_create(
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in pairs
+        )
+
+
+def merge_into_containers(apps, schema_editor):
+    for model_name, field_name, _ in CONTAINERS:
+        model = apps.get_model('products', model_name)
+        recipes_by_user = defaultdict(list)
+        for user_id, recipe_id in model.objects.values_list('user', 'recipe'):
+            recipes_by_user[user_id].append(recipe_id)
+        model.objects.all().delete()
+        for user_id, recipe_ids in recipes_by_user.items():
+            container = model.objects.create(user_id=user_id)
+            getattr(container, field_name).set(recipe_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_favorite_cart_recipe_field'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_into_pairs, merge_into_containers),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.0.5 on 2026-10-18 06:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0005_remove_favorite_cart_m2m'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_format', models.CharField(choices=[('pdf', 'PDF'), ('txt', 'Текст'), ('csv', 'CSV'), ('json', 'JSON')], default='pdf', max_length=4, verbose_name='Формат')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='Статус')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='Прогресс')),
+                ('cart_version', models.CharField(max_length=32, verbose_name='Версия корзины')),
+                ('file', models.FileField(blank=True, upload_to='shopping_lists', verbose_name='Файл')),
+                ('error', models.CharField(blank=True, max_length=255, verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создано')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Выгрузка списка покупок',
+                'verbose_name_plural': 'Выгрузки списка покупок',
+                'ordering': ['created'],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import F
+
+# Copy of products.units.CONVERSIONS at the time of this migration.
+CONVERSIONS = {
+    'г.': ('г.', 1),
+    'г': ('г.', 1),
+    'кг.': ('г.', 1000),
+    'кг': ('г.', 1000),
+    'мл.': ('мл.', 1),
+    'мл': ('мл.', 1),
+    'л.': ('мл.', 1000),
+    'л': ('мл.', 1000),
+    'ст.': ('мл.', 250),
+    'стакан': ('мл.', 250),
+    'стл.л.': ('мл.', 15),
+    'ст. л.': ('мл.', 15),
+    'ч.л.': ('мл.', 5),
+    'ч. л.': ('мл.', 5),
+}
+
+
+def fill_base_units(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Ingredient = apps.get_model('products', 'Ingredient')
+    Ingredient.objects.update(base_amount=F('amount'))
+    for unit, (base_unit, factor) in CONVERSIONS.items():
+        Product.objects.filter(measurement_unit=unit).update(
+            base_unit=base_unit
+        )
+        Ingredient.objects.filter(product__measurement_unit=unit).update(
+            base_amount=F('amount') * factor
+        )
+    Product.objects.filter(base_unit='').update(
+        base_unit=F('measurement_unit')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_shoppinglistjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='base_unit',
+            field=models.CharField(default='', editable=False, max_length=10, verbose_name='Базовая единица измерения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='base_amount',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Количество в базовых единицах'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_base_units, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+CREATE_INDEXES = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS products_product_name_prefix '
+    'ON products_product (lower(name) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS products_product_name_trgm '
+    'ON products_product USING gin (lower(name) gin_trgm_ops)',
+)
+DROP_INDEXES = (
+    'DROP INDEX IF EXISTS products_product_name_prefix',
+    'DROP INDEX IF EXISTS products_product_name_trgm',
+)
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_base_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(CREATE_INDEXES),
+                             run_on_postgresql(DROP_INDEXES)),
+    ]
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+                ('base_amount', models.IntegerField(editable=False, verbose_name='Количество в базовых единицах')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='products.Product', verbose_name='Продукт')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='products.Recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'ингредиент',
+                'verbose_name_plural': 'ингредиенты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'product'), name='unique_recipe_ingredient'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def copy_to_recipes(apps, schema_editor):
+    Recipe = apps.get_model('products', 'Recipe')
+    RecipeIngredient = apps.get_model('products', 'RecipeIngredient')
+    through = Recipe._meta.get_field('ingredients').remote_field.through
+    rows = {}
+    for recipe_id, product_id, amount, base_amount in (
+            through.objects.values_list('recipe', 'ingredient__product',
+                                        'ingredient__amount',
+                                        'ingredient__base_amount')):
+        # Older recipes may list a product twice with different amounts.
+        row = rows.setdefault((recipe_id, product_id), [0, 0])
+        row[0] += amount
+        row[1] += base_amount
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe_id=recipe_id, product_id=product_id,
+                         amount=amount, base_amount=base_amount)
+        for (recipe_id, product_id), (amount, base_amount) in rows.items()
+    )
+
+
+def copy_to_shared(apps, schema_editor):
+    Recipe = apps.get_model('products', 'Recipe')
+    Ingredient = apps.get_model('products', 'Ingredient')
+    RecipeIngredient = apps.get_model('products', 'RecipeIngredient')
+    through = Recipe._meta.get_field('ingredients').remote_field.through
+    links = []
+    for row in RecipeIngredient.objects.all():
+        ingredient, _ = Ingredient.objects.get_or_create(
+            product_id=row.product_id, amount=row.amount,
+            defaults={'base_amount': row.base_amount},
+        )
+        links.append(through(recipe_id=row.recipe_id,
+                             ingredient_id=ingredient.id))
+    through.objects.bulk_create(links)
+    RecipeIngredient.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_to_recipes, copy_to_shared),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.5 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_remove_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='detail_image',
+            field=models.ImageField(blank=True, editable=False, upload_to='images/detail', verbose_name='Картинка для страницы'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='images/thumbnails', verbose_name='Миниатюра'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.0.5 on 2026-10-18 06:49
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count(model, field):
+    return Coalesce(models.Subquery(
+        model.objects.filter(**{field: models.OuterRef('pk')}).order_by()
+        .values(field).annotate(count=models.Count('pk')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('products', 'Recipe')
+    FavoriteRecipe = apps.get_model('products', 'FavoriteRecipe')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    Recipe.objects.update(favorites_count=count(FavoriteRecipe, 'recipe'))
+    User.objects.update(recipes_count=count(Recipe, 'author'),
+                        followers_count=count(Follow, 'author'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_counters'),
+        ('products', '0015_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['favorites_count', 'pub_date', 'id'], name='recipe_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.5 on 2026-10-18 07:26
+
+from django.db import migrations, models
+import products.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglistjob',
+            name='claimed',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Взято в работу'),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglistjob',
+            name='file',
+            field=models.FileField(blank=True, storage=products.storage.PrivateStorage(), upload_to='shopping_lists', verbose_name='Файл'),
+        ),
+    ]
@@ -1,5 +1,14 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.dispatch import Signal
+
+from users.models import Follow
+from . import units
+from .storage import private_storage
+from .utils import change_count
+from .versions import bump_versions
 
 User = get_user_model()
 
@@ -24,6 +33,8 @@ class Product(models.Model):
     name = models.CharField(max_length=100, verbose_name='Название')
     measurement_unit = models.CharField(max_length=10, choices=UNITS_CHOICES,
                                         verbose_name='Единица измерения')
+    base_unit = models.CharField(max_length=10, editable=False,
+                                 verbose_name='Базовая единица измерения')
 
     class Meta:
         constraints = [
@@ -36,22 +47,14 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
-
-class Ingredient(models.Model):
-    product = models.ForeignKey(Product, on_delete=models.CASCADE,
-                                verbose_name='Продукт')
-    amount = models.IntegerField(verbose_name='Количество')
-
-    class Meta:
-        constraints = [
-            models.UniqueConstraint(fields=['product', 'amount'],
-                                    name='unique_ingredients')
-        ]
-        verbose_name = 'ингредиент'
-        verbose_name_plural = 'ингредиенты'
-
-    def __str__(self):
-        return self.product.name
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.base_unit = units.base_unit(self.measurement_unit)
+        super().save(*args, **kwargs)
+        if not adding:
+            self.recipe_ingredients.update(
+                base_amount=F('amount') * units.factor(self.measurement_unit)
+            )
 
 
 class Tag(models.Model):
@@ -82,26 +85,77 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch('ingredients', queryset=(
+                RecipeIngredient.objects.select_related('product')
+            )),
+        )
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(is_favorited=false,
+                                 is_in_shopping_cart=false,
+                                 is_author_subscribed=false)
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_author_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author')
+            )),
+        )
+
+    def latest_per_author(self, limit):
+        latest = Recipe.objects.filter(
+            author=OuterRef('author')
+        ).values('pk')[:limit]
+        return self.filter(pk__in=Subquery(latest))
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(User, verbose_name='Автор',
                                on_delete=models.CASCADE,
-                               related_name='recipes')
+                               related_name='recipes', db_index=False)
     name = models.CharField(max_length=100, verbose_name='Название',
                             null=False)
     image = models.ImageField(verbose_name="Картинка еды", upload_to='images')
+    thumbnail = models.ImageField(verbose_name='Миниатюра', blank=True,
+                                  editable=False,
+                                  upload_to='images/thumbnails')
+    detail_image = models.ImageField(verbose_name='Картинка для страницы',
+                                     blank=True, editable=False,
+                                     upload_to='images/detail')
     text = models.CharField(max_length=1000, verbose_name='Описание')
-    ingredients = models.ManyToManyField(Ingredient,
-                                         related_name='recipes',
-                                         verbose_name='Ингредиент')
     tags = models.ManyToManyField(Tag, verbose_name='Тэги')
     cooking_time = models.IntegerField(verbose_name='Время приготовления',
                                        null=False)
     pub_date = models.DateTimeField(verbose_name="Дата публикации",
-                                    auto_now_add=True, db_index=True,
-                                    null=False)
+                                    auto_now_add=True, null=False)
+    updated_at = models.DateTimeField(verbose_name='Дата изменения',
+                                      auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В избранном'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['pub_date', 'id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['author', 'pub_date', 'id'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['favorites_count', 'pub_date', 'id'],
+                         name='recipe_popular_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -109,17 +163,112 @@ class Recipe(models.Model):
         return self.name
 
 
+class RecipeIngredient(models.Model):
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE,
+                               related_name='ingredients',
+                               verbose_name='Рецепт')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='recipe_ingredients',
+                                verbose_name='Продукт')
+    amount = models.IntegerField(verbose_name='Количество')
+    base_amount = models.IntegerField(
+        editable=False,
+        verbose_name='Количество в базовых единицах'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'product'],
+                                    name='unique_recipe_ingredient')
+        ]
+        verbose_name = 'ингредиент'
+        verbose_name_plural = 'ингредиенты'
+
+    def __str__(self):
+        return self.product.name
+
+    def save(self, *args, **kwargs):
+        self.base_amount = units.to_base_amount(self.product.measurement_unit,
+                                                self.amount)
+        super().save(*args, **kwargs)
+
+
+# Sent with the user by UserRecipeQuerySet.add, whose bulk_create
+# sends no post_save.
+recipes_added = Signal()
+
+
+class UserRecipeQuerySet(models.QuerySet):
+    # Recipe column kept equal to the number of rows of each recipe.
+    counter = None
+
+    def add(self, user, recipes):
+        with transaction.atomic():
+            if self.counter is None:
+                created = self.bulk_create(
+                    [self.model(user=user, recipe=recipe)
+                     for recipe in recipes],
+                    ignore_conflicts=True,
+                )
+            else:
+                created = self.add_counted(user, recipes)
+            # After the write, or a reader could cache the old rows
+            # under the new version before they are committed.
+            bump_versions(self.model)
+            recipes_added.send(sender=self.model, user=user)
+        return created
+
+    def add_counted(self, user, recipes):
+        ids = {recipe.id for recipe in recipes}
+        # Locks the recipes, so concurrent adds count a row once.
+        list(Recipe.objects.filter(id__in=ids).order_by('id')
+             .select_for_update().values_list('id'))
+        ids -= set(self.filter(user=user, recipe__in=ids)
+                   .values_list('recipe_id', flat=True))
+        created = self.bulk_create(
+            [self.model(user=user, recipe_id=pk) for pk in ids]
+        )
+        change_count(Recipe.objects.filter(id__in=ids), self.counter, 1)
+        return created
+
+    def remove(self, user, recipes):
+        rows = self.filter(user=user, recipe__in=recipes)
+        with transaction.atomic():
+            if self.counter is None:
+                deleted, _ = rows.delete()
+            else:
+                ids = list(rows.select_for_update()
+                           .values_list('recipe_id', flat=True))
+                deleted, _ = self.filter(user=user, recipe__in=ids).delete()
+                change_count(Recipe.objects.filter(id__in=ids),
+                             self.counter, -1)
+            bump_versions(self.model)
+        return deleted
+        with transaction.atomic():
+            ids = list(rows.select_for_update()
+                       .values_list('recipe_id', flat=True))
+            deleted, _ = self.filter(user=user, recipe__in=ids).delete()
+            change_count(Recipe.objects.filter(id__in=ids), self.counter, -1)
+        return deleted
+
+
+class FavoriteRecipeQuerySet(UserRecipeQuerySet):
+    counter = 'favorites_count'
+
+
 class FavoriteRecipe(models.Model):
-    user = models.ForeignKey(User, verbose_name='пользователь',
+    user = models.ForeignKey(User, verbose_name='Пользователь',
                              on_delete=models.CASCADE,
-                             related_name='FavoriteRecipesUser')
-    recipes = models.ManyToManyField(Recipe, blank=True,
-                                     related_name='favorite_recipe',
-                                     verbose_name='Рецепты')
+                             related_name='favorites')
+    recipe = models.ForeignKey(Recipe, verbose_name='Рецепт',
+                               on_delete=models.CASCADE,
+                               related_name='favorites')
+
+    objects = FavoriteRecipeQuerySet.as_manager()
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=['user', 'recipes'],
+            models.UniqueConstraint(fields=['user', 'recipe'],
                                     name='unique_favorite_recipe')
         ]
         verbose_name = 'Избранный рецепт'
@@ -127,17 +276,81 @@ class FavoriteRecipe(models.Model):
 
 
 class ShoppingCart(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE,
-                             related_name='shoppingCartUser',
-                             verbose_name='Пользователь')
-    cart = models.ManyToManyField(Recipe, blank=True,
-                                  related_name='cart',
-                                  verbose_name='Рецепты')
+    user = models.ForeignKey(User, verbose_name='Пользователь',
+                             on_delete=models.CASCADE,
+                             related_name='shopping_cart')
+    recipe = models.ForeignKey(Recipe, verbose_name='Рецепт',
+                               on_delete=models.CASCADE,
+                               related_name='shopping_cart')
+
+    objects = UserRecipeQuerySet.as_manager()
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=['user', 'cart'],
+            models.UniqueConstraint(fields=['user', 'recipe'],
                                     name='unique_cart')
         ]
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
+
+
+class FeedEntry(models.Model):
+    """A recipe of a followed author copied into the user's feed."""
+    user = models.ForeignKey(User, verbose_name='Пользователь',
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    recipe = models.ForeignKey(Recipe, verbose_name='Рецепт',
+                               on_delete=models.CASCADE,
+                               related_name='feed_entries')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry')
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class ShoppingListJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+    FORMAT_CHOICES = [
+        ('pdf', 'PDF'),
+        ('txt', 'Текст'),
+        ('csv', 'CSV'),
+        ('json', 'JSON'),
+    ]
+    user = models.ForeignKey(User, verbose_name='Пользователь',
+                             on_delete=models.CASCADE,
+                             related_name='shopping_list_jobs')
+    export_format = models.CharField(max_length=4, choices=FORMAT_CHOICES,
+                                     default='pdf', verbose_name='Формат')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=PENDING, db_index=True,
+                              verbose_name='Статус')
+    progress = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Прогресс')
+    cart_version = models.CharField(max_length=32,
+                                    verbose_name='Версия корзины')
+    file = models.FileField(upload_to='shopping_lists', blank=True,
+                            storage=private_storage, verbose_name='Файл')
+    error = models.CharField(max_length=255, blank=True,
+                             verbose_name='Ошибка')
+    created = models.DateTimeField(auto_now_add=True, db_index=True,
+                                   verbose_name='Создано')
+    claimed = models.DateTimeField(null=True, blank=True, editable=False,
+                                   verbose_name='Взято в работу')
+
+    class Meta:
+        ordering = ['created']
+        verbose_name = 'Выгрузка списка покупок'
+        verbose_name_plural = 'Выгрузки списка покупок'
@@ -1,6 +1,237 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+                                   Paginator)
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .versions import get_query_versions
+
+TRUE_VALUES = ('1', 'true', 'True')
+COUNT_KEY = 'count:{digest}'
+COUNT_TIMEOUT = 60
+# Unfiltered tables at least this big are counted from planner stats.
+ESTIMATE_MIN_ROWS = 100000
+
+
+def estimate_count(queryset):
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < ESTIMATE_MIN_ROWS:
+        return None
+    return int(row[0])
+
+
+def count_queryset(queryset):
+    """
+    Returns the number of objects in the queryset and whether it is
+    exact. Exact counts are cached until a table the query reads
+    changes, and skip the annotations and joined columns by counting
+    distinct primary keys.
+    """
+    estimate = estimate_count(queryset)
+    if estimate is not None:
+        return estimate, False
+    keys = queryset.order_by().values('pk')
+    try:
+        sql, params = keys.query.sql_with_params()
+    except EmptyResultSet:
+        # queryset.none() has no SQL to key the count on.
+        return 0, True
+    digest = md5(repr(
+        (sql, params, get_query_versions(sql))
+    ).encode()).hexdigest()
+    key = COUNT_KEY.format(digest=digest)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.model._default_manager.filter(pk__in=keys).count()
+        cache.set(key, count, COUNT_TIMEOUT)
+    return count, True
+
+
+class EstimatedPage(Page):
+    """Page of an estimated count, it knows itself if more rows follow."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self.next_exists = has_next
+
+    def has_next(self):
+        return self.next_exists
+
+
+class CountCachingPaginator(Paginator):
+    """
+    Paginator over count_queryset. With an estimated count every page
+    number is allowed, an empty page simply ends the list.
+    """
+    @cached_property
+    def counted(self):
+        return count_queryset(self.object_list)
+
+    @property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def count_exact(self):
+        return self.counted[1]
+
+    def validate_number(self, number):
+        if self.count_exact:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if self.count_exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # One row more tells whether the list goes on.
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        return EstimatedPage(rows[:self.per_page], number, self,
+                             len(rows) > self.per_page)
 
 
 class LimitPaginator(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    django_paginator_class = CountCachingPaginator
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.page.paginator.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages through recipes by (pub_date, id) instead of an OFFSET, so a
+    page costs the same at any depth. The total is only counted when
+    asked for with ?count=true.
+    """
+    page_size = LimitPaginator.page_size
+    page_size_query_param = LimitPaginator.page_size_query_param
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.count = self.count_exact = None
+        if request.query_params.get(self.count_query_param) in TRUE_VALUES:
+            self.count, self.count_exact = count_queryset(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            pub_date, pk = position
+            # The first condition lets the index scan start at the
+            # cursor instead of filtering every newer row.
+            queryset = queryset.filter(pub_date__lte=pub_date).filter(
+                Q(pub_date__lt=pub_date) | Q(pk__lt=pk)
+            )
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        self.page = page[:page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                cursor.encode()
+            ).decode().split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, recipe):
+        position = f'{recipe.pub_date.isoformat()}|{recipe.pk}'
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_exact', self.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+
+class RecipePaginator(LimitPaginator):
+    """
+    Page numbers by default. ?pagination=cursor, or a cursor from a
+    previous page, switches to keyset pages for infinite scrolling.
+    Keyset pages follow publication order, so a feed sorted otherwise
+    (?ordering=popular) keeps page numbers.
+    """
+    pagination_query_param = 'pagination'
+
+    def use_keyset(self, queryset, request):
+        if queryset.query.order_by:
+            return False
+        return (request.query_params.get(self.pagination_query_param)
+                == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(queryset, request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
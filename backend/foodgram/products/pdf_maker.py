@@ -1,53 +1,163 @@
-from io import BytesIO
+import logging
+import os
+from contextlib import contextmanager
+from itertools import groupby
+from operator import attrgetter
+from time import perf_counter
 
-from django.shortcuts import get_object_or_404
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
 from foodgram import settings
-from .models import Ingredient, ShoppingCart
-
-
-def count_amount_of_all_ingredients_in_cart(current_user):
-    cart = get_object_or_404(ShoppingCart, user=current_user)
-    ingredients = {}
-    for ingredient_id in cart.cart.all().values_list('ingredients', flat=True):
-        ing = get_object_or_404(Ingredient, id=ingredient_id)
-        key = f'{ing.product.name} ({ing.product.measurement_unit})'
-        if key not in ingredients:
-            ingredients[key] = 0
-        ingredients[key] += ing.amount
-    return ingredients
-
-
-def create_list_of_str_of_ingredients(ingredients):
-    ingredients_list = []
-    number = 1
-    for ing in ingredients.keys():
-        line = (f'{number}) {ing} — '
-                f'{ingredients[ing]}')
-        ingredients_list.append(line)
-        number += 1
-    return ingredients_list
-
-
-def create_pdf(ingredients_list):
-    buffer = BytesIO()
-    documentTitle = 'Список покупок'
-    pdf = canvas.Canvas(buffer)
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+TITLE = 'Список покупок'
+HEADER = 'header'
+FONT = 'main'
+FONT_FILE = 'timesnewroman.ttf'
+TITLE_SIZE = 28
+HEADING_SIZE = 14
+TEXT_SIZE = 12
+FOOTER_SIZE = 9
+LEADING = 16
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 40
+COLUMNS = 2
+COLUMN_GAP = 20
+COLUMN_WIDTH = (
+    PAGE_WIDTH - 2 * MARGIN - (COLUMNS - 1) * COLUMN_GAP
+) / COLUMNS
+HEADER_HEIGHT = TITLE_SIZE + LEADING
+UNIT_NAMES = dict(Product.UNITS_CHOICES)
+
+
+def register_fonts():
+    """Parses and registers the TTF font once per process."""
+    if FONT in pdfmetrics.getRegisteredFontNames():
+        return
     pdfmetrics.registerFont(
-        TTFont('main', settings.STATIC_ROOT + '/timesnewroman.ttf')
+        TTFont(FONT, os.path.join(settings.STATIC_ROOT, FONT_FILE))
     )
-    pdf.setFont('main', 28)
-    pdf.drawCentredString(300, 800, documentTitle)
-    text = pdf.beginText(40, 740)
-    text.setFont('main', 24)
-    for line in ingredients_list:
-        text.textLine(line)
-    pdf.drawText(text)
-    pdf.showPage()
-    pdf.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
+
+
+def define_header(pdf):
+    """Draws the page header once as a form XObject reused by every page."""
+    baseline = PAGE_HEIGHT - MARGIN - TITLE_SIZE
+    pdf.beginForm(HEADER)
+    pdf.setFont(FONT, TITLE_SIZE)
+    pdf.drawCentredString(PAGE_WIDTH / 2, baseline, TITLE)
+    pdf.line(MARGIN, baseline - LEADING / 2,
+             PAGE_WIDTH - MARGIN, baseline - LEADING / 2)
+    pdf.endForm()
+
+
+class ShoppingListLayout:
+    """
+    Lays lines out top to bottom in columns and starts a new column or
+    page when the current one is full. Finished pages are handed over
+    to the canvas right away, so only the current page is kept as
+    drawing operations.
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.page = 0
+        self.start_page()
+
+    @property
+    def x(self):
+        return MARGIN + self.column * (COLUMN_WIDTH + COLUMN_GAP)
+
+    def start_page(self):
+        self.page += 1
+        self.column = 0
+        self.pdf.doForm(HEADER)
+        self.top = PAGE_HEIGHT - MARGIN - HEADER_HEIGHT
+        self.y = self.top
+
+    def finish_page(self):
+        self.pdf.setFont(FONT, FOOTER_SIZE)
+        self.pdf.drawCentredString(PAGE_WIDTH / 2, MARGIN / 2, str(self.page))
+        self.pdf.showPage()
+
+    def next_column(self):
+        self.column += 1
+        if self.column < COLUMNS:
+            self.y = self.top
+            return
+        self.finish_page()
+        self.start_page()
+
+    def ensure_space(self, height):
+        if self.y - height < MARGIN:
+            self.next_column()
+
+    def heading(self, text):
+        # Keep a heading together with at least one line below it.
+        self.ensure_space(3 * LEADING)
+        self.pdf.setFont(FONT, HEADING_SIZE)
+        self.y -= 2 * LEADING if self.y != self.top else LEADING
+        self.pdf.drawString(self.x, self.y, text)
+
+    def line(self, text):
+        if pdfmetrics.stringWidth(text, FONT, TEXT_SIZE) <= COLUMN_WIDTH:
+            parts = [text]
+        else:
+            parts = simpleSplit(text, FONT, TEXT_SIZE, COLUMN_WIDTH)
+        self.ensure_space(len(parts) * LEADING)
+        self.pdf.setFont(FONT, TEXT_SIZE)
+        for part in parts:
+            self.y -= LEADING
+            self.pdf.drawString(self.x, self.y, part)
+
+
+class ShoppingListRenderer:
+    """
+    Renders shopping lists into PDF and keeps how long each stage of
+    the last document took: font parsing, layout and serialization.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def measure(self, stage):
+        start = perf_counter()
+        yield
+        self.timings[stage] = perf_counter() - start
+
+    def render(self, shopping_list, output):
+        self.timings = {}
+        with self.measure('fonts'):
+            register_fonts()
+        with self.measure('layout'):
+            pdf = canvas.Canvas(output, pagesize=A4, pageCompression=1)
+            pdf.setTitle(TITLE)
+            define_header(pdf)
+            self.draw(ShoppingListLayout(pdf), shopping_list)
+        with self.measure('serialization'):
+            pdf.save()
+        logger.debug('Shopping list PDF rendered: %s', ', '.join(
+            f'{stage} {seconds * 1000:.1f}ms'
+            for stage, seconds in self.timings.items()
+        ))
+
+    def draw(self, layout, shopping_list):
+        unit = attrgetter('measurement_unit')
+        number = 0
+        for measurement_unit, items in groupby(
+                sorted(shopping_list, key=unit), key=unit):
+            layout.heading(UNIT_NAMES.get(measurement_unit, measurement_unit))
+            for number, item in enumerate(items, start=number + 1):
+                layout.line(f'{number}) {item.name} — {item.amount}')
+        layout.finish_page()
+
+
+def create_pdf(shopping_list, output):
+    """Renders the shopping list grouped by measurement unit into output."""
+    ShoppingListRenderer().render(shopping_list, output)
@@ -0,0 +1,96 @@
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .versions import get_versions
+
+RESPONSE_KEY = 'response:{digest}'
+
+# Parameters that only pick a renderer, the data is the same for all.
+IGNORED_PARAMS = {'format'}
+
+stats = Counter(hits=0, misses=0, bypasses=0,
+                fragment_hits=0, fragment_misses=0)
+
+
+def normalize_params(query_params, set_params=()):
+    """
+    Query parameters sorted by name. Values of set_params are sorted
+    and deduplicated too, the others keep their order.
+    """
+    params = []
+    for name, values in sorted(query_params.lists()):
+        if name in IGNORED_PARAMS:
+            continue
+        if name in set_params:
+            values = sorted(set(values))
+        params.append((name, values))
+    return params
+
+
+def get_cache_key(request, models, set_params=()):
+    """
+    The key of the response to this request while none of the models'
+    tables has changed. A write to any of them changes the key.
+    """
+    tables = {model._meta.db_table for model in models}
+    digest = hashlib.md5(repr((
+        request.build_absolute_uri(request.path),
+        normalize_params(request.query_params, set_params),
+        get_versions(tables),
+    )).encode()).hexdigest()
+    return RESPONSE_KEY.format(digest=digest)
+
+
+def get_hit_rate(hits, misses):
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+
+def get_stats():
+    return {
+        **stats,
+        'hit_rate': get_hit_rate(stats['hits'], stats['misses']),
+        'fragment_hit_rate': get_hit_rate(stats['fragment_hits'],
+                                          stats['fragment_misses']),
+    }
+
+
+class AnonymousCacheMixin:
+    """
+    Caches the data of list and retrieve responses for anonymous users,
+    so a hit skips the queries and serialization. get_cache_models
+    returns the models the responses are built from, cache_set_params
+    are the parameters whose value order does not matter.
+    """
+    cache_models = ()
+    cache_set_params = ()
+
+    def get_cache_models(self):
+        return self.cache_models
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request,
+                                        *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request,
+                                        *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE or request.user.is_authenticated:
+            stats['bypasses'] += 1
+            return handler(request, *args, **kwargs)
+        key = get_cache_key(request, self.get_cache_models(),
+                            self.cache_set_params)
+        data = cache.get(key)
+        if data is not None:
+            stats['hits'] += 1
+            return Response(data)
+        stats['misses'] += 1
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
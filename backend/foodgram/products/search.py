@@ -0,0 +1,43 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Lower
+
+from .catalog import get_catalog
+
+SEARCH_LIMIT = 20
+
+
+def normalize_query(query):
+    return query.strip().lower()
+
+
+def search_catalog(query, limit=SEARCH_LIMIT):
+    """
+    Products from the in-memory catalog whose name contains the query,
+    case-insensitively, those starting with it first.
+    """
+    return get_catalog().search(normalize_query(query), limit)
+
+
+def search_products(queryset, query, limit=SEARCH_LIMIT):
+    """
+    Same as search_catalog as a queryset. On PostgreSQL it runs on the
+    lower(name) indexes; other databases use the catalog name index,
+    as SQLite's LIKE is not case-insensitive for Cyrillic.
+    """
+    query = normalize_query(query)
+    if connection.vendor == 'postgresql':
+        return queryset.annotate(
+            name_lower=Lower('name'),
+            rank=Case(
+                When(name_lower__startswith=query, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+        ).filter(name_lower__contains=query).order_by('rank', 'name_lower')
+    ids = get_catalog().index.search(query, limit)
+    return queryset.filter(id__in=ids).order_by(Case(
+        *[When(id=pk, then=Value(position))
+          for position, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    ))
@@ -1,13 +1,19 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.db import IntegrityError, transaction
+from django.urls import reverse
 from rest_framework import serializers
 
 from users.models import Follow
 from users.serializers import UserSerializer
-from .models import (FavoriteRecipe, Ingredient, Product, Recipe, ShoppingCart,
-                     Tag)
-from .utils import get_request
+from . import units
+from .catalog import get_products_or_404
+from .feeds import follow_author
+from .fields import RecipeImageField, ResizedImageField
+from .images import refresh_images
+from .jobs import create_job
+from .models import (FavoriteRecipe, Product, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListJob, Tag)
+from .utils import change_count, get_recipes_limit, get_request
 
 User = get_user_model()
 
@@ -30,7 +36,7 @@ class IngredientSerializer(serializers.ModelSerializer):
     measurement_unit = serializers.CharField(source="product.measurement_unit")
 
     class Meta:
-        model = Ingredient
+        model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
@@ -39,28 +45,40 @@ class RecipeListSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
     ingredients = IngredientSerializer(many=True, read_only=True)
     author = UserSerializer(many=False, read_only=True)
-    image = Base64ImageField(required=True)
+    image = RecipeImageField(required=True)
+    thumbnail = ResizedImageField()
+    detail_image = ResizedImageField()
     tags = TagSerializer(many=True, read_only=True)
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'thumbnail', 'detail_image', 'text',
+                  'cooking_time')
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_author_subscribed'):
+            instance.author.is_subscribed = instance.is_author_subscribed
+        return super().to_representation(instance)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         current_user = get_request(self.context).user
         if current_user.is_anonymous:
             return False
         return FavoriteRecipe.objects.filter(user=current_user,
-                                             recipes=obj).exists()
+                                             recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         current_user = get_request(self.context).user
         if current_user.is_anonymous:
             return False
         return ShoppingCart.objects.filter(user=current_user,
-                                           cart=obj).exists()
+                                           recipe=obj).exists()
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -68,14 +86,17 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
     ingredients = serializers.SerializerMethodField()
     author = UserSerializer(many=False, read_only=True)
-    image = Base64ImageField(required=True)
+    image = RecipeImageField(required=True)
+    thumbnail = ResizedImageField()
+    detail_image = ResizedImageField()
     tags = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'thumbnail', 'detail_image', 'text',
+                  'cooking_time')
 
     def validate(self, data):
         try:
@@ -129,17 +150,25 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return data
 
-    def get_or_create_ingredients(self):
+    def create_ingredients(self, recipe):
+        """Inserts all ingredients of the recipe with one query."""
         request_data = get_request(self.context).data
-        ingredients_ids = []
-        for ingredient in request_data.get('ingredients'):
-            product = get_object_or_404(Product, id=ingredient.get('id'))
-            ing = Ingredient.objects.get_or_create(
-                product=product,
-                amount=ingredient.get('amount')
+        amounts = {
+            int(ingredient.get('id')): int(ingredient.get('amount'))
+            for ingredient in request_data.get('ingredients')
+        }
+        products = get_products_or_404(amounts)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                product=products[product_id],
+                amount=amount,
+                base_amount=units.to_base_amount(
+                    products[product_id].measurement_unit, amount
+                ),
             )
-            ingredients_ids.append(ing[0].id)
-        return ingredients_ids
+            for product_id, amount in amounts.items()
+        ])
 
     def create(self, validated_data):
         request_data = get_request(self.context).data
@@ -150,17 +179,22 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             text=validated_data['text'],
             cooking_time=validated_data['cooking_time']
         )
-        ingredients_ids = self.get_or_create_ingredients()
-        recipe.ingredients.set(ingredients_ids)
-        tags_ids = request_data.get('tags')
-        recipe.tags.set(tags_ids)
+        # The storage has moved the decoded temporary file into place.
+        validated_data['image'].close()
+        refresh_images(recipe)
+        self.create_ingredients(recipe)
+        recipe.tags.add(*request_data.get('tags'))
         return recipe
 
     def update(self, instance, validated_data):
         request_data = get_request(self.context).data
+        if 'image' in validated_data:
+            refresh_images(instance)
         super().update(instance, validated_data)
-        ingredients_ids = self.get_or_create_ingredients()
-        instance.ingredients.set(ingredients_ids)
+        if 'image' in validated_data:
+            validated_data['image'].close()
+        instance.ingredients.all().delete()
+        self.create_ingredients(instance)
         tags_ids = request_data.get('tags')
         instance.tags.set(tags_ids)
         return instance
@@ -171,45 +205,58 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_ingredients(self, obj):
-        ingredients = obj.ingredients.all()
+        ingredients = obj.ingredients.select_related('product')
         serializer = IngredientSerializer(ingredients, many=True)
         return serializer.data
 
     def get_is_favorited(self, obj):
         current_user = get_request(self.context).user
         return FavoriteRecipe.objects.filter(user=current_user,
-                                             recipes=obj).exists()
+                                             recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
         current_user = get_request(self.context).user
         return ShoppingCart.objects.filter(user=current_user,
-                                           cart=obj).exists()
+                                           recipe=obj).exists()
 
 
 class FavoriteRecipesSerializer(serializers.ModelSerializer):
+    thumbnail = ResizedImageField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'thumbnail', 'cooking_time')
 
-    def validate(self, data):
+    def create(self, validated_data):
         recipe = self.context.get('recipe')
-        current_user = get_request(self.context).user
-        if FavoriteRecipe.objects.filter(
-                user=current_user, recipes=recipe).exists():
+        try:
+            with transaction.atomic():
+                FavoriteRecipe.objects.create(
+                    user=get_request(self.context).user, recipe=recipe
+                )
+                change_count(Recipe.objects.filter(id=recipe.id),
+                             'favorites_count', 1)
+        except IntegrityError:
             raise serializers.ValidationError(
                 'Вы уже подписаны на этот рецепт'
             )
-        return data
-
-    def create(self, validated_data):
-        recipe = self.context.get('recipe')
-        favor_list, _ = FavoriteRecipe.objects.get_or_create(
-            user=get_request(self.context).user
-        )
-        favor_list.recipes.add(recipe)
         return recipe
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+    )
+
+    def validate_recipes(self, value):
+        recipes_ids = set(value)
+        recipes = list(Recipe.objects.filter(id__in=recipes_ids))
+        if len(recipes) != len(recipes_ids):
+            raise serializers.ValidationError('Рецепт не найден')
+        return recipes
+
+
 class SubscribeUserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -230,7 +277,6 @@ class FollowSerializer(serializers.ModelSerializer):
     username = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -240,11 +286,7 @@ class FollowSerializer(serializers.ModelSerializer):
     def validate(self, data):
         author = self.context.get('author')
         user = get_request(self.context).user
-        if Follow.objects.filter(user=user, author=author).exists():
-            raise serializers.ValidationError({
-                'errors': 'Вы уже подписались на данного пользователя'
-            })
-        elif user == author:
+        if user == author:
             raise serializers.ValidationError({
                 'errors': 'Нельзя подписаться на самого себя'
             })
@@ -253,8 +295,16 @@ class FollowSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         author = self.context.get('author')
         user = get_request(self.context).user
-        follow, _ = Follow.objects.get_or_create(user=user)
-        follow.author.add(author)
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=user, author=author)
+                change_count(User.objects.filter(id=author.id),
+                             'followers_count', 1)
+                follow_author(user, author)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                'errors': 'Вы уже подписались на данного пользователя'
+            })
         return author
 
     def get_is_subscribed(self, obj):
@@ -271,17 +321,16 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         recipes = Recipe.objects.filter(author=obj)
+        recipes_limit = get_recipes_limit(get_request(self.context))
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
         serializer = FavoriteRecipesSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
 
 class ListFollowersSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -292,35 +341,63 @@ class ListFollowersSerializer(serializers.ModelSerializer):
         current_user = get_request(self.context).user
         if current_user == obj:
             return True
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(user=current_user, author=obj).exists()
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(author=obj)
+        if hasattr(obj, 'latest_recipes'):
+            recipes = obj.latest_recipes
+        else:
+            recipes = Recipe.objects.filter(author=obj)
+            recipes_limit = get_recipes_limit(get_request(self.context))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         serializer = FavoriteRecipesSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
+    thumbnail = ResizedImageField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'thumbnail', 'cooking_time')
 
-    def validate(self, data):
+    def create(self, validated_data):
         recipe = self.context.get('recipe')
-        if ShoppingCart.objects.filter(user=get_request(self.context).user,
-                                       cart=recipe).exists():
+        user = get_request(self.context).user
+        try:
+            with transaction.atomic():
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+        except IntegrityError:
             raise serializers.ValidationError({
                 'errors': 'Рецепт уже находится в корзине'
             })
-        return data
+        return recipe
+
+
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+    format = serializers.ChoiceField(
+        source='export_format',
+        choices=ShoppingListJob.FORMAT_CHOICES,
+        default='pdf',
+    )
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShoppingListJob
+        fields = ('id', 'format', 'status', 'progress', 'error', 'created',
+                  'download_url')
+        read_only_fields = ('status', 'progress', 'error', 'created')
 
     def create(self, validated_data):
-        recipe = self.context.get('recipe')
-        cart, created = ShoppingCart.objects.get_or_create(
-            user=get_request(self.context).user
+        return create_job(get_request(self.context).user,
+                          validated_data['export_format'])
+
+    def get_download_url(self, obj):
+        if obj.status != ShoppingListJob.DONE:
+            return None
+        return get_request(self.context).build_absolute_uri(
+            reverse('shopping_list_jobs-download', args=[obj.id])
         )
-        cart.cart.add(recipe)
-        return recipe
@@ -0,0 +1,154 @@
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from typing import NamedTuple
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import units
+from .models import (Product, Recipe, RecipeIngredient, ShoppingCart,
+                     recipes_added)
+from .pdf_maker import create_pdf
+from .versions import get_version_cache
+
+CART_VERSION_KEY = 'shopping_cart_version:{user_id}'
+PDF_KEY = 'shopping_list_pdf:{user_id}:{version}'
+PDF_TIMEOUT = 60 * 60 * 24
+PDF_CACHE_MAX_SIZE = 1024 * 1024
+
+
+class ShoppingListItem(NamedTuple):
+    name: str
+    measurement_unit: str
+    amount: float
+
+
+def shopping_list_rows(user):
+    """
+    Sums up ingredients of all recipes in the user's cart in one query.
+    Products sharing a name are added up in their common base unit.
+    """
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__shopping_cart__user=user)
+        .values_list('product__name', 'product__base_unit')
+        .annotate(
+            base_amount=Sum('base_amount'),
+            units_count=Count('product__measurement_unit', distinct=True),
+            unit=Max('product__measurement_unit'),
+            amount=Sum('amount'),
+        )
+        .order_by('product__name', 'product__base_unit')
+    )
+
+
+def to_item(name, base_unit, base_amount, units_count, unit, amount):
+    # A product used in a single non-base unit (spoons, glasses) reads
+    # better as is than converted to millilitres.
+    if units_count == 1 and units.factor(unit) != 1:
+        return ShoppingListItem(name, unit, amount)
+    return ShoppingListItem(name, *units.humanize(base_unit, base_amount))
+
+
+def get_shopping_list(user):
+    return [to_item(*row) for row in shopping_list_rows(user)]
+
+
+def iter_shopping_list(user):
+    return (to_item(*row) for row in shopping_list_rows(user).iterator())
+
+
+def get_cart_version(user):
+    """
+    Random token identifying the current cart contents. It is replaced
+    by a new one whenever the cart is invalidated.
+    """
+    key = CART_VERSION_KEY.format(user_id=user.id)
+    cache = get_version_cache()
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate_cart(*user_ids):
+    """
+    Drops the cart versions once the transaction is committed. Dropped
+    earlier, a download could still read the old cart and cache it
+    under the new version.
+    """
+    keys = [CART_VERSION_KEY.format(user_id=user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(
+            lambda: get_version_cache().delete_many(keys)
+        )
+
+
+def invalidate_carts_with_recipe(recipe):
+    invalidate_cart(*ShoppingCart.objects.filter(
+        recipe=recipe
+    ).values_list('user', flat=True))
+
+
+def invalidate_carts_with_product(product):
+    invalidate_cart(*ShoppingCart.objects.filter(
+        recipe__ingredients__product=product
+    ).values_list('user', flat=True).distinct())
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    # A new name or unit changes the lists of carts using the product.
+    if not created:
+        invalidate_carts_with_product(instance)
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    invalidate_carts_with_product(instance)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def ingredient_changed(sender, instance, **kwargs):
+    invalidate_carts_with_recipe(instance.recipe_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    invalidate_carts_with_recipe(instance)
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def cart_row_changed(sender, instance, **kwargs):
+    invalidate_cart(instance.user_id)
+
+
+@receiver(recipes_added, sender=ShoppingCart)
+def cart_rows_added(sender, user, **kwargs):
+    invalidate_cart(user.id)
+
+
+def get_shopping_list_pdf(user):
+    """
+    Returns a file object with the rendered PDF. Documents bigger than
+    PDF_CACHE_MAX_SIZE are spooled to disk and are not cached.
+    """
+    key = PDF_KEY.format(user_id=user.id, version=get_cart_version(user))
+    pdf = cache.get(key)
+    if pdf is not None:
+        return BytesIO(pdf)
+    output = SpooledTemporaryFile(max_size=PDF_CACHE_MAX_SIZE)
+    create_pdf(get_shopping_list(user), output)
+    if output.tell() <= PDF_CACHE_MAX_SIZE:
+        output.seek(0)
+        cache.set(key, output.read(), PDF_TIMEOUT)
+    output.seek(0)
+    return output
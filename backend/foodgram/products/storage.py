@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+
+class PrivateStorage(FileSystemStorage):
+    """
+    Files under PRIVATE_MEDIA_ROOT, which the web server does not
+    serve. They are only sent by views that check who asks for them.
+    """
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location,
+                                      settings.PRIVATE_MEDIA_ROOT)
+
+
+private_storage = PrivateStorage()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+
+from products.serializers import (ProductSerializer, RecipeListSerializer,
+                                  TagSerializer)
+
+from .utils import (FoodgramTestCase, committing, create_product,
+                    create_recipe, create_tag, create_user, get_client)
+
+
+class ConditionalGetTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.tag = create_tag('breakfast')
+        cls.product = create_product('flour')
+        cls.recipe = create_recipe(create_user('author'), tags=[cls.tag],
+                                   ingredients=[(cls.product, 100)])
+        cls.endpoints = [
+            ('/api/recipes/', RecipeListSerializer),
+            (f'/api/recipes/{cls.recipe.id}/', RecipeListSerializer),
+            ('/api/tags/', TagSerializer),
+            (f'/api/tags/{cls.tag.id}/', TagSerializer),
+            ('/api/ingredients/', ProductSerializer),
+            (f'/api/ingredients/{cls.product.id}/', ProductSerializer),
+        ]
+
+    def spy(self, serializer_class):
+        return mock.patch.object(
+            serializer_class, 'to_representation', autospec=True,
+            side_effect=serializer_class.to_representation
+        )
+
+    def assert_not_modified(self, client, header, validator):
+        for url, serializer_class in self.endpoints:
+            with self.subTest(url=url), self.spy(serializer_class) as spy:
+                # Recipe fragments cached by an earlier URL would skip
+                # the serializer on the first request as well.
+                cache.clear()
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(spy.called)
+                spy.reset_mock()
+                response = client.get(url, **{header: response[validator]})
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(spy.called)
+
+    def test_if_none_match_anonymous(self):
+        self.assert_not_modified(get_client(), 'HTTP_IF_NONE_MATCH', 'ETag')
+
+    def test_if_none_match_authenticated(self):
+        self.assert_not_modified(get_client(self.user), 'HTTP_IF_NONE_MATCH',
+                                 'ETag')
+
+    def test_if_modified_since(self):
+        self.assert_not_modified(get_client(self.user),
+                                 'HTTP_IF_MODIFIED_SINCE', 'Last-Modified')
+
+    def test_etag_depends_on_the_user(self):
+        for url, _ in self.endpoints[:2]:
+            with self.subTest(url=url):
+                etag = get_client().get(url)['ETag']
+                response = get_client(self.user).get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_product_import_changes_the_etag(self):
+        etag = get_client().get('/api/ingredients/')['ETag']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('соль,г.\n')
+            with committing():
+                call_command('load_products', path, stdout=StringIO())
+        response = get_client().get('/api/ingredients/',
+                                    HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('соль', [product['name']
+                               for product in response.json()])
+
+    def test_etag_survives_response_cache_culling(self):
+        for url, _ in self.endpoints:
+            with self.subTest(url=url):
+                etag = get_client().get(url)['ETag']
+                # Culling drops entries of the default cache only.
+                cache.clear()
+                response = get_client().get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
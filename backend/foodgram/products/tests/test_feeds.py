@@ -0,0 +1,61 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from products.feeds import trim_feed, trim_feeds
+from products.models import FeedEntry
+from users.models import Follow
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+@override_settings(FEED_FANOUT=True, FEED_MAX_LENGTH=3)
+class FeedTrimTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = create_user('reader')
+        self.author = create_user('author')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.recipes = [create_recipe(self.author, name=f'recipe {number}')
+                        for number in range(5)]
+
+    def get_feed_ids(self):
+        return set(FeedEntry.objects.filter(
+            user=self.reader
+        ).values_list('recipe', flat=True))
+
+    def test_fan_out_grows_past_the_limit(self):
+        self.assertEqual(len(self.get_feed_ids()), 5)
+
+    def test_trim_keeps_the_newest(self):
+        trim_feed(self.reader)
+        self.assertEqual(self.get_feed_ids(),
+                         {recipe.id for recipe in self.recipes[2:]})
+
+    def test_trim_keeps_unfollowed_authors_entries(self):
+        # The feed is cut on its own entries, not on the current follows.
+        Follow.objects.filter(user=self.reader).delete()
+        trim_feed(self.reader)
+        self.assertEqual(len(self.get_feed_ids()), 3)
+
+    def test_trim_feeds_skips_short_feeds(self):
+        other = create_user('other')
+        Follow.objects.create(user=other, author=create_user('quiet'))
+        self.assertEqual(trim_feeds(), 1)
+        self.assertEqual(trim_feeds(), 0)
+
+    def test_command(self):
+        output = StringIO()
+        call_command('rebuild_feeds', '--trim', stdout=output)
+        self.assertIn('1 feeds trimmed.', output.getvalue())
+        self.assertEqual(len(self.get_feed_ids()), 3)
+
+    def test_feed_after_trim(self):
+        trim_feeds()
+        response = get_client(self.reader).get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [recipe.id for recipe in reversed(self.recipes[2:])],
+        )
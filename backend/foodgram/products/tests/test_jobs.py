@@ -0,0 +1,78 @@
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from products.jobs import (JOB_TIMEOUT, JOB_TTL, claim_job, create_job,
+                           delete_expired_jobs, fail_stale_jobs, run_job)
+from products.models import ShoppingCart, ShoppingListJob
+
+from .utils import (FoodgramTestCase, create_product, create_recipe,
+                    create_user, get_client)
+
+
+class ShoppingListJobTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('user')
+        recipe = create_recipe(create_user('author'), ingredients=[
+            (create_product('flour'), 100)
+        ])
+        ShoppingCart.objects.add(self.user, [recipe])
+
+    def run_next_job(self):
+        job = claim_job()
+        run_job(job)
+        job.refresh_from_db()
+        return job
+
+    def test_file_is_outside_media_root(self):
+        create_job(self.user, 'txt')
+        job = self.run_next_job()
+        self.assertEqual(job.status, ShoppingListJob.DONE)
+        path = os.path.realpath(job.file.path)
+        self.assertTrue(path.startswith(
+            os.path.realpath(settings.PRIVATE_MEDIA_ROOT)
+        ))
+        self.assertFalse(path.startswith(
+            os.path.realpath(settings.MEDIA_ROOT)
+        ))
+
+    def test_download_is_owner_only(self):
+        create_job(self.user, 'txt')
+        job = self.run_next_job()
+        url = f'/api/shopping_list_jobs/{job.id}/download/'
+        response = get_client(self.user).get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'flour', b''.join(response.streaming_content))
+        stranger = get_client(create_user('stranger'))
+        self.assertEqual(stranger.get(url).status_code, 404)
+
+    def make_running(self, claimed):
+        job = create_job(self.user, 'txt')
+        ShoppingListJob.objects.filter(id=job.id).update(
+            status=ShoppingListJob.RUNNING, claimed=claimed
+        )
+        return job
+
+    def test_running_job_is_reused(self):
+        job = self.make_running(timezone.now())
+        self.assertEqual(create_job(self.user, 'txt'), job)
+        self.assertEqual(fail_stale_jobs(), 0)
+
+    def test_stale_running_job_is_replaced(self):
+        stale = self.make_running(timezone.now() - JOB_TIMEOUT * 2)
+        job = create_job(self.user, 'txt')
+        self.assertNotEqual(job, stale)
+        self.assertEqual(job.status, ShoppingListJob.PENDING)
+
+    def test_stale_running_job_fails_and_expires(self):
+        stale = self.make_running(timezone.now() - JOB_TIMEOUT * 2)
+        self.assertEqual(fail_stale_jobs(), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ShoppingListJob.FAILED)
+        ShoppingListJob.objects.filter(id=stale.id).update(
+            created=timezone.now() - JOB_TTL * 2
+        )
+        delete_expired_jobs()
+        self.assertFalse(ShoppingListJob.objects.filter(id=stale.id).exists())
@@ -0,0 +1,50 @@
+from unittest import mock
+
+from products.models import Recipe
+from products.pagination import CountCachingPaginator
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+@mock.patch('products.pagination.estimate_count', return_value=50)
+class EstimatedCountTests(FoodgramTestCase):
+    """The planner estimate (50 rows) is below the real 127 rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        for number in range(127):
+            create_recipe(author, name=f'recipe {number}')
+
+    def test_pages_past_the_estimate(self, estimate_count):
+        paginator = CountCachingPaginator(Recipe.objects.order_by('id'), 6)
+        page = paginator.page(12)
+        self.assertFalse(paginator.count_exact)
+        self.assertEqual(len(page), 6)
+        self.assertTrue(page.has_next())
+
+    def test_last_page(self, estimate_count):
+        page = CountCachingPaginator(Recipe.objects.order_by('id'), 6).page(22)
+        self.assertEqual(len(page), 1)
+        self.assertFalse(page.has_next())
+
+    def test_view_serves_pages_past_the_estimate(self, estimate_count):
+        response = get_client().get('/api/recipes/?page=12')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 50)
+        self.assertFalse(data['count_exact'])
+        self.assertEqual(len(data['results']), 6)
+        self.assertIn('page=13', data['next'])
+
+
+class ExactCountTests(FoodgramTestCase):
+    def test_page_past_the_count_is_404(self):
+        create_recipe(create_user('author'))
+        response = get_client().get('/api/recipes/?page=2')
+        self.assertEqual(response.status_code, 404)
+
+    def test_empty_queryset(self):
+        response = get_client().get('/api/recipes/?is_favorited=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 0)
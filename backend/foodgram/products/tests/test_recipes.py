@@ -0,0 +1,196 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from products import fragments
+from products.catalog import get_catalog
+from products.models import (FavoriteRecipe, Recipe, RecipeIngredient,
+                             ShoppingCart)
+from users.models import Follow
+
+from .utils import (FoodgramTestCase, committing, create_product,
+                    create_recipe, create_tag, create_user, get_client,
+                    get_image)
+
+
+class RecipeListQueryTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        tags = [create_tag('breakfast'), create_tag('dinner')]
+        products = [create_product(f'product {i}') for i in range(3)]
+        authors = [create_user(f'author{i}') for i in range(5)]
+        cls.recipes = recipes = [
+            create_recipe(authors[i % 5], name=f'recipe {i}', tags=tags,
+                          ingredients=[(product, 10) for product in products])
+            for i in range(100)
+        ]
+        FavoriteRecipe.objects.add(cls.user, recipes[::2])
+        ShoppingCart.objects.add(cls.user, recipes[::3])
+        Follow.objects.create(user=cls.user, author=authors[0])
+
+    def count_queries(self, client, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/recipes/?limit={limit}')
+        self.assertEqual(len(response.json()['results']), limit)
+        return len(queries)
+
+    def assert_cold_queries(self, client):
+        # Count, page ids, then the recipes with their tags and
+        # ingredients for the fragments.
+        for limit in (6, 100):
+            cache.clear()
+            self.assertEqual(self.count_queries(client, limit), 5)
+
+    def test_anonymous_cold(self):
+        self.assert_cold_queries(get_client())
+
+    def test_authenticated_cold(self):
+        self.assert_cold_queries(get_client(self.user))
+
+    def test_anonymous_warm(self):
+        for limit in (6, 100):
+            self.count_queries(get_client(), limit)
+            self.assertEqual(self.count_queries(get_client(), limit), 0)
+
+    def test_authenticated_warm(self):
+        # Only the page ids with the user's flags, the rest is cached.
+        for limit in (6, 100):
+            self.count_queries(get_client(self.user), limit)
+            self.assertEqual(
+                self.count_queries(get_client(self.user), limit), 1
+            )
+
+    def test_authenticated_flags(self):
+        results = get_client(self.user).get(
+            '/api/recipes/?limit=100'
+        ).json()['results']
+        favorited = {recipe.id for recipe in self.recipes[::2]}
+        in_cart = {recipe.id for recipe in self.recipes[::3]}
+        for recipe in results:
+            self.assertEqual(recipe['is_favorited'], recipe['id'] in favorited)
+            self.assertEqual(recipe['is_in_shopping_cart'],
+                             recipe['id'] in in_cart)
+            self.assertEqual(recipe['author']['is_subscribed'],
+                             recipe['author']['username'] == 'author0')
+
+
+class AuthorVersionTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('user')
+        self.authors = [create_user(f'author{i}') for i in range(2)]
+        self.recipes = [create_recipe(author) for author in self.authors]
+        self.get_list(get_client())
+        self.get_list(get_client(self.user))
+
+    def get_list(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/recipes/')
+        return response.json()['results'], len(queries)
+
+    def get_serialized_ids(self):
+        """Ids of the recipes serialized again, not read from fragments."""
+        serialize = mock.Mock(wraps=fragments.serialize_recipes)
+        with mock.patch.object(fragments, 'serialize_recipes', serialize):
+            self.get_list(get_client(self.user))
+        return {pk for call in serialize.call_args_list for pk in call[0][1]}
+
+    def test_signup_keeps_caches(self):
+        with committing():
+            create_user('newcomer')
+        self.assertEqual(self.get_list(get_client())[1], 0)
+        self.assertEqual(self.get_serialized_ids(), set())
+
+    def test_edit_of_user_without_recipes_keeps_caches(self):
+        with committing():
+            self.user.first_name = 'new'
+            self.user.save()
+        self.assertEqual(self.get_list(get_client())[1], 0)
+        self.assertEqual(self.get_serialized_ids(), set())
+
+    def test_password_change_keeps_caches(self):
+        author = self.authors[0]
+        author.set_password('0ld-Passw0rd')
+        author.save()
+        with committing():
+            response = get_client(author).post(
+                '/api/users/set_password/',
+                {'current_password': '0ld-Passw0rd',
+                 'new_password': 'n3w-Passw0rd'},
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.get_serialized_ids(), set())
+
+    def test_author_edit_refreshes_their_recipes(self):
+        with committing():
+            self.authors[0].first_name = 'renamed'
+            self.authors[0].save()
+        self.assertEqual(self.get_serialized_ids(), {self.recipes[0].id})
+        results, _ = self.get_list(get_client())
+        names = {recipe['id']: recipe['author']['first_name']
+                 for recipe in results}
+        self.assertEqual(names[self.recipes[0].id], 'renamed')
+
+    def test_author_edit_changes_detail_etag(self):
+        url = f'/api/recipes/{self.recipes[0].id}/'
+        etag = get_client().get(url)['ETag']
+        with committing():
+            self.authors[0].last_name = 'renamed'
+            self.authors[0].save()
+        response = get_client().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author']['last_name'], 'renamed')
+
+
+class RecipeCreateTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.tags = [create_tag('breakfast'), create_tag('dinner')]
+        cls.products = [create_product(f'product {i}') for i in range(30)]
+
+    def get_data(self, product_ids):
+        return {
+            'name': 'recipe', 'text': 'text', 'cooking_time': 10,
+            'image': get_image(), 'tags': [tag.id for tag in self.tags],
+            'ingredients': [{'id': pk, 'amount': 5} for pk in product_ids],
+        }
+
+    def post_recipe(self, product_ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = get_client(self.user).post(
+                '/api/recipes/', self.get_data(product_ids), format='json'
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()['ingredients']),
+                         len(product_ids))
+        return len(queries)
+
+    def assert_query_count(self, expected):
+        ids = [product.id for product in self.products]
+        self.assertEqual(self.post_recipe(ids[:3]), expected)
+        self.assertEqual(self.post_recipe(ids), expected)
+
+    def test_query_count_with_catalog(self):
+        get_catalog()
+        self.assert_query_count(12)
+
+    @override_settings(CATALOG_CACHE=False)
+    def test_query_count_without_catalog(self):
+        self.assert_query_count(13)
+
+    def test_unknown_product_rolls_back(self):
+        product_ids = [product.id for product in self.products] + [0]
+        response = get_client(self.user).post(
+            '/api/recipes/', self.get_data(product_ids), format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(RecipeIngredient.objects.exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 0)
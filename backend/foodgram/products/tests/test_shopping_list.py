@@ -0,0 +1,196 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from products.models import Product, RecipeIngredient, ShoppingCart
+from products.shopping_list import (ShoppingListItem, get_cart_version,
+                                    get_shopping_list)
+
+from .utils import (FoodgramTestCase, committing, create_product,
+                    create_recipe, create_tag, create_user, get_client,
+                    get_image)
+
+
+class ShoppingListQueryTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        products = [create_product(f'product {i}') for i in range(15)]
+        cls.recipes = [
+            create_recipe(author, name=f'recipe {i}', ingredients=[
+                (product, i + 1) for product in products
+            ])
+            for i in range(20)
+        ]
+
+    def count_queries(self, recipes_count):
+        user = create_user(f'user{recipes_count}')
+        ShoppingCart.objects.add(user, self.recipes[:recipes_count])
+        with CaptureQueriesContext(connection) as queries:
+            items = get_shopping_list(user)
+        self.assertEqual(len(items), 15)
+        self.assertEqual(items[0], ShoppingListItem(
+            'product 0', 'г.', sum(range(1, recipes_count + 1))
+        ))
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_cart(self):
+        self.assertEqual(self.count_queries(2), 1)
+        self.assertEqual(self.count_queries(20), 1)
+
+
+class MixedUnitCartTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('user')
+        self.author = create_user('author')
+
+    def add_recipe(self, *ingredients):
+        recipe = create_recipe(self.author, ingredients=ingredients)
+        ShoppingCart.objects.add(self.user, [recipe])
+        return recipe
+
+    def test_grams_and_kilograms_share_a_line(self):
+        self.add_recipe((create_product('мука', Product.GRAM), 300))
+        self.add_recipe((create_product('мука', Product.KILOGRAM), 1))
+        self.assertEqual(get_shopping_list(self.user), [
+            ShoppingListItem('мука', 'кг.', 1.3),
+        ])
+
+    def test_spoons_only(self):
+        salt = create_product('соль', Product.TEASPOON)
+        self.add_recipe((salt, 2))
+        self.add_recipe((salt, 3))
+        self.assertEqual(get_shopping_list(self.user), [
+            ShoppingListItem('соль', 'ч.л.', 5),
+        ])
+
+    def test_spoons_and_milliliters(self):
+        self.add_recipe((create_product('масло', Product.TABLESPOON), 2))
+        self.add_recipe((create_product('масло', Product.MILLILITER), 20))
+        self.assertEqual(get_shopping_list(self.user), [
+            ShoppingListItem('масло', 'мл.', 50),
+        ])
+
+    def test_different_base_units_stay_apart(self):
+        self.add_recipe((create_product('молоко', Product.LITER), 1),
+                        (create_product('молоко', Product.GRAM), 100))
+        self.assertEqual(get_shopping_list(self.user), [
+            ShoppingListItem('молоко', 'г.', 100),
+            ShoppingListItem('молоко', 'л.', 1),
+        ])
+
+    def test_unit_change_recomputes_base_amount(self):
+        sugar = create_product('сахар', Product.GRAM)
+        self.add_recipe((sugar, 2))
+        sugar.measurement_unit = Product.KILOGRAM
+        sugar.save()
+        self.assertEqual(
+            RecipeIngredient.objects.get(product=sugar).base_amount, 2000
+        )
+        self.assertEqual(get_shopping_list(self.user), [
+            ShoppingListItem('сахар', 'кг.', 2),
+        ])
+
+
+class CartVersionTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('user')
+        self.author = create_user('author')
+        self.tag = create_tag('breakfast')
+        self.flour = create_product('flour')
+        self.recipe = create_recipe(self.author, tags=[self.tag],
+                                    ingredients=[(self.flour, 100)])
+        ShoppingCart.objects.add(self.user, [self.recipe])
+
+    def assert_invalidated_on_commit(self, change):
+        version = get_cart_version(self.user)
+        with committing():
+            change()
+            # Before the commit a download must still see the old
+            # version, or it would cache the old list under a new one.
+            self.assertEqual(get_cart_version(self.user), version)
+        self.assertNotEqual(get_cart_version(self.user), version)
+
+    def test_recipe_update(self):
+        def change():
+            response = get_client(self.author).put(
+                f'/api/recipes/{self.recipe.id}/', {
+                    'name': 'new', 'text': 'text', 'cooking_time': 5,
+                    'image': get_image(), 'tags': [self.tag.id],
+                    'ingredients': [{'id': self.flour.id, 'amount': 300}],
+                }, format='json'
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+        self.assert_invalidated_on_commit(change)
+
+    def test_recipe_delete(self):
+        def change():
+            response = get_client(self.author).delete(
+                f'/api/recipes/{self.recipe.id}/'
+            )
+            self.assertEqual(response.status_code, 204)
+        self.assert_invalidated_on_commit(change)
+
+    def test_product_rename(self):
+        def change():
+            self.flour.name = 'wheat flour'
+            self.flour.save()
+        self.assert_invalidated_on_commit(change)
+
+    def test_product_unit_change(self):
+        def change():
+            self.flour.measurement_unit = Product.KILOGRAM
+            self.flour.save()
+        self.assert_invalidated_on_commit(change)
+
+    def test_product_delete(self):
+        self.assert_invalidated_on_commit(self.flour.delete)
+
+    def test_ingredient_save(self):
+        def change():
+            ingredient = RecipeIngredient.objects.get(recipe=self.recipe)
+            ingredient.amount = 700
+            ingredient.save()
+        self.assert_invalidated_on_commit(change)
+
+    def test_ingredient_delete(self):
+        self.assert_invalidated_on_commit(
+            RecipeIngredient.objects.get(recipe=self.recipe).delete
+        )
+
+    def test_cart_row_create(self):
+        def change():
+            ShoppingCart.objects.create(user=self.user,
+                                        recipe=create_recipe(self.author))
+        self.assert_invalidated_on_commit(change)
+
+    def test_cart_row_delete(self):
+        self.assert_invalidated_on_commit(
+            ShoppingCart.objects.get(user=self.user).delete
+        )
+
+    def test_cart_add(self):
+        self.assert_invalidated_on_commit(
+            lambda: ShoppingCart.objects.add(self.user,
+                                             [create_recipe(self.author)])
+        )
+
+    def test_api_cart_remove(self):
+        def change():
+            response = get_client(self.user).delete(
+                f'/api/recipes/{self.recipe.id}/shopping_cart/'
+            )
+            self.assertEqual(response.status_code, 204)
+        self.assert_invalidated_on_commit(change)
+
+    def test_model_recipe_delete(self):
+        self.assert_invalidated_on_commit(self.recipe.delete)
+
+    def test_unrelated_product(self):
+        version = get_cart_version(self.user)
+        with committing():
+            other = create_product('salt')
+            other.name = 'sea salt'
+            other.save()
+        self.assertEqual(get_cart_version(self.user), version)
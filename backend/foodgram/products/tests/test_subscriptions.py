@@ -0,0 +1,45 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Follow
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+class SubscriptionsQueryTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [create_user(f'author{i}') for i in range(10)]
+        for author in cls.authors:
+            for number in range(5):
+                create_recipe(author, name=f'recipe {number}')
+
+    def get_subscriptions(self, follows, query=''):
+        user = create_user(f'user{Follow.objects.count()}')
+        for author in self.authors[:follows]:
+            Follow.objects.create(user=user, author=author)
+        client = get_client(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                f'/api/users/subscriptions/?limit=10{query}'
+            )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), follows)
+        return results, len(queries)
+
+    def test_query_count_does_not_grow_with_follows(self):
+        # Count, the page of authors and their recipes.
+        for query in ('', '&recipes_limit=2'):
+            with self.subTest(query=query):
+                _, one = self.get_subscriptions(1, query)
+                _, ten = self.get_subscriptions(10, query)
+                self.assertEqual(one, 3)
+                self.assertEqual(ten, 3)
+
+    def test_recipes_limit(self):
+        results, _ = self.get_subscriptions(10, '&recipes_limit=2')
+        for author in results:
+            self.assertEqual(len(author['recipes']), 2)
+            self.assertEqual(author['recipes_count'], 5)
+            self.assertTrue(author['is_subscribed'])
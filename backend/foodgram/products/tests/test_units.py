@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+from products import units
+from products.shopping_list import ShoppingListItem, to_item
+
+
+class HumanizeTests(SimpleTestCase):
+    def test_small_amount_keeps_base_unit(self):
+        self.assertEqual(units.humanize('г.', 999), ('г.', 999))
+
+    def test_switches_to_larger_unit(self):
+        self.assertEqual(units.humanize('г.', 1500), ('кг.', 1.5))
+        self.assertEqual(units.humanize('мл.', 2000), ('л.', 2))
+
+    def test_whole_amount_is_int(self):
+        self.assertIsInstance(units.humanize('г.', 2000)[1], int)
+
+    def test_unit_without_larger_one(self):
+        self.assertEqual(units.humanize('шт.', 5000), ('шт.', 5000))
+
+    def test_base_amount(self):
+        self.assertEqual(units.to_base_amount('кг.', 2), 2000)
+        self.assertEqual(units.to_base_amount('стл.л.', 2), 30)
+        self.assertEqual(units.to_base_amount('щепотка', 2), 2)
+
+
+class ToItemTests(SimpleTestCase):
+    def test_mixed_units_are_humanized(self):
+        self.assertEqual(to_item('мука', 'г.', 1200, 2, 'кг.', 201),
+                         ShoppingListItem('мука', 'кг.', 1.2))
+
+    def test_single_spoon_unit_is_kept(self):
+        self.assertEqual(to_item('соль', 'мл.', 25, 1, 'ч.л.', 5),
+                         ShoppingListItem('соль', 'ч.л.', 5))
+
+    def test_single_base_unit(self):
+        self.assertEqual(to_item('сахар', 'г.', 300, 1, 'г.', 300),
+                         ShoppingListItem('сахар', 'г.', 300))
@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.test import TransactionTestCase, override_settings
+
+from products import versions
+from products.models import FavoriteRecipe, ShoppingCart
+from users.models import Follow
+
+from .utils import TEST_CACHES, create_recipe, create_user, get_client
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BumpAfterWriteTests(TransactionTestCase):
+    """
+    Runs in autocommit, where a version bumped before the write would
+    be replaced while the old rows are still there.
+    """
+
+    def setUp(self):
+        self.user = create_user('user')
+        self.author = create_user('author')
+        self.recipe = create_recipe(self.author)
+
+    def assert_bumped_after(self, write, written):
+        seen = []
+
+        def new_version():
+            seen.append(written())
+            return 'version'
+        with mock.patch.object(versions, 'new_version', new_version):
+            write()
+        self.assertTrue(seen)
+        self.assertTrue(all(seen))
+
+    def test_add_and_remove(self):
+        for model in (ShoppingCart, FavoriteRecipe):
+            with self.subTest(model=model.__name__):
+                rows = model.objects.filter(user=self.user)
+                self.assert_bumped_after(
+                    lambda: model.objects.add(self.user, [self.recipe]),
+                    rows.exists,
+                )
+                self.assert_bumped_after(
+                    lambda: model.objects.remove(self.user, [self.recipe]),
+                    lambda: not rows.exists(),
+                )
+
+    def test_unfollow(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assert_bumped_after(
+            lambda: get_client(self.user).delete(
+                f'/api/users/{self.author.id}/subscribe/'
+            ),
+            lambda: not Follow.objects.filter(user=self.user).exists(),
+        )
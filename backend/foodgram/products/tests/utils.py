@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+from base64 import b64encode
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from products.models import Product, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'versions',
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FoodgramTestCase(TestCase):
+    """Runs on a local memory cache and throwaway media directories."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(
+            MEDIA_ROOT=os.path.join(cls.media_root, 'public'),
+            PRIVATE_MEDIA_ROOT=os.path.join(cls.media_root, 'private'),
+        )
+        cls.media_override.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls.remove_media()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.remove_media()
+
+    @classmethod
+    def remove_media(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+
+def create_user(username):
+    return User.objects.create(email=f'{username}@example.com',
+                               username=username, first_name=username,
+                               last_name=username)
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+def create_product(name, measurement_unit=Product.GRAM):
+    return Product.objects.create(name=name,
+                                  measurement_unit=measurement_unit)
+
+
+def create_tag(slug, color=Tag.BLUE):
+    return Tag.objects.create(name=slug, color=color, slug=slug)
+
+
+def create_recipe(author, name='recipe', ingredients=(), tags=()):
+    """ingredients are (product, amount) pairs."""
+    recipe = Recipe.objects.create(author=author, name=name,
+                                   image='images/recipe.png', text=name,
+                                   cooking_time=10)
+    for product, amount in ingredients:
+        RecipeIngredient.objects.create(recipe=recipe, product=product,
+                                        amount=amount)
+    recipe.tags.set(tags)
+    return recipe
+
+
+def get_image():
+    output = BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(output, 'PNG')
+    return 'data:image/png;base64,' + b64encode(output.getvalue()).decode()
+
+
+@contextmanager
+def committing():
+    """
+    Runs the on_commit callbacks registered inside the block once it
+    exits, as if the test transaction had been committed there.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
@@ -0,0 +1,51 @@
+GRAM = 'г.'
+KILOGRAM = 'кг.'
+MILLILITER = 'мл.'
+LITER = 'л.'
+
+# Measurement unit -> (base unit, how many base units it holds). Both the
+# Product.UNITS_CHOICES spelling and the one used in data/ingredients.json
+# are listed. Units missing here (шт., щепотка, ...) are their own base.
+CONVERSIONS = {
+    'г.': (GRAM, 1),
+    'г': (GRAM, 1),
+    'кг.': (GRAM, 1000),
+    'кг': (GRAM, 1000),
+    'мл.': (MILLILITER, 1),
+    'мл': (MILLILITER, 1),
+    'л.': (MILLILITER, 1000),
+    'л': (MILLILITER, 1000),
+    'ст.': (MILLILITER, 250),
+    'стакан': (MILLILITER, 250),
+    'стл.л.': (MILLILITER, 15),
+    'ст. л.': (MILLILITER, 15),
+    'ч.л.': (MILLILITER, 5),
+    'ч. л.': (MILLILITER, 5),
+}
+
+# Base unit -> bigger unit used for display once the amount reaches it.
+LARGER_UNITS = {
+    GRAM: (KILOGRAM, 1000),
+    MILLILITER: (LITER, 1000),
+}
+
+
+def base_unit(unit):
+    return CONVERSIONS.get(unit, (unit, 1))[0]
+
+
+def factor(unit):
+    return CONVERSIONS.get(unit, (unit, 1))[1]
+
+
+def to_base_amount(unit, amount):
+    return amount * factor(unit)
+
+
+def humanize(unit, amount):
+    """Switches a base amount to a bigger unit when it reads better."""
+    larger_unit, larger_factor = LARGER_UNITS.get(unit, (unit, 1))
+    if larger_factor == 1 or amount < larger_factor:
+        return unit, amount
+    amount = round(amount / larger_factor, 3)
+    return larger_unit, int(amount) if amount.is_integer() else amount
@@ -1,9 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (DownloadShoppingList, FavoriteViewSet, FollowViewSet,
-                    IngredientViewSet, RecipeViewSet, ShoppingCartViewSet,
-                    TagViewSet)
+from .views import (CatalogStats, DownloadShoppingList, FavoriteViewSet,
+                    FollowViewSet, IngredientViewSet, RecipeViewSet,
+                    ResponseCacheStats, ShoppingCartViewSet,
+                    ShoppingListJobViewSet, TagViewSet)
 
 router = DefaultRouter()
 
@@ -13,8 +14,13 @@ router.register(r'recipes', FavoriteViewSet)
 router.register(r'tags', TagViewSet)
 router.register(r'ingredients', IngredientViewSet)
 router.register(r'users', FollowViewSet)
+router.register(r'shopping_list_jobs', ShoppingListJobViewSet,
+                basename='shopping_list_jobs')
 
 urlpatterns = [
+    path('catalog/stats/', CatalogStats.as_view(), name='catalog_stats'),
+    path('response_cache/stats/', ResponseCacheStats.as_view(),
+         name='response_cache_stats'),
     path('recipes/download_shopping_cart/', DownloadShoppingList.as_view(),
          name='download_shopping_cart'),
     path('', include(router.urls)),
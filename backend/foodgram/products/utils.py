@@ -1,3 +1,7 @@
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+
 def get_request(context):
     try:
         request = context.get('request')
@@ -6,3 +10,27 @@ def get_request(context):
             'error': 'request was not received'
         })
     return request
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return None
+    try:
+        recipes_limit = int(recipes_limit)
+    except ValueError:
+        raise ValidationError({
+            'errors': 'recipes_limit должен быть числом'
+        })
+    if recipes_limit < 0:
+        raise ValidationError({
+            'errors': 'recipes_limit не может быть отрицательным'
+        })
+    return recipes_limit
+
+
+def change_count(queryset, field, delta):
+    """Adds delta to a counter column of every row, never below zero."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
@@ -0,0 +1,168 @@
+from time import time
+from uuid import uuid4
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+VERSION_KEY = 'table_version:{table}'
+AUTHOR_VERSION_KEY = 'author_version:{id}'
+
+# Tables whose changes make cached counts and responses stale. Saves
+# of single objects are tracked with signals, as are deletes of
+# recipes, tags and products. Bulk writes (UserRecipeQuerySet,
+# unfollowing, load_products, recipe ingredients and image sizes)
+# either call bump_versions themselves or come with a save of their
+# recipe, so their deletes stay one statement.
+VERSIONED_MODELS = ('products.Recipe', 'products.Recipe_tags',
+                    'products.Tag', 'products.Product',
+                    'products.RecipeIngredient', 'products.FavoriteRecipe',
+                    'products.ShoppingCart', 'users.Follow', 'users.User')
+DELETE_TRACKED_MODELS = ('products.Recipe', 'products.Tag',
+                         'products.Product')
+# Fields whose saves alone change nothing a response shows.
+UNVERSIONED_FIELDS = {'last_login', 'password'}
+
+
+def get_version_cache():
+    """The cache of version tokens, set apart from the culled one."""
+    return caches['versions']
+
+
+def new_version():
+    """A unique token that also tells when it was made."""
+    return f'{time():.6f}-{uuid4().hex}'
+
+
+def get_version_time(version):
+    """
+    Unix time a token was made at. Tokens from before they carried it
+    are treated as made just now.
+    """
+    made, _, _ = version.partition('-')
+    try:
+        return float(made)
+    except ValueError:
+        return time()
+
+
+def get_versioned_tables():
+    return [apps.get_model(label)._meta.db_table for label in VERSIONED_MODELS]
+
+
+def get_tokens(keys):
+    """Reads version tokens, making the missing ones."""
+    cache = get_version_cache()
+    versions = cache.get_many(keys)
+    for key in set(keys) - versions.keys():
+        cache.add(key, new_version(), None)
+        versions[key] = cache.get(key)
+    return versions
+
+
+def get_versions(tables):
+    """Returns the current version token of every given table."""
+    keys = sorted(VERSION_KEY.format(table=table) for table in tables)
+    versions = get_tokens(keys)
+    return [versions[key] for key in keys]
+
+
+def get_author_versions(ids):
+    """
+    Version tokens of the authors, by id. They change when a profile
+    shown next to the author's recipes does.
+    """
+    keys = {pk: AUTHOR_VERSION_KEY.format(id=pk) for pk in ids}
+    versions = get_tokens(list(keys.values()))
+    return {pk: versions[key] for pk, key in keys.items()}
+
+
+def get_query_versions(sql):
+    """Version tokens of the versioned tables a query reads."""
+    return get_versions(
+        table for table in get_versioned_tables() if f'"{table}"' in sql
+    )
+
+
+def bump_versions(*models):
+    """Replaces the version tokens once the transaction is committed."""
+    keys = [VERSION_KEY.format(table=model._meta.db_table)
+            for model in models]
+    transaction.on_commit(
+        lambda: get_version_cache().set_many(
+            {key: new_version() for key in keys}, None
+        )
+    )
+
+
+def model_changed(sender, update_fields=None, **kwargs):
+    if update_fields is not None and update_fields <= UNVERSIONED_FIELDS:
+        return
+    bump_versions(sender)
+
+
+def m2m_relation_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_versions(sender)
+
+
+def author_changed(sender, instance, created, update_fields=None,
+                   **kwargs):
+    if created or (update_fields is not None
+                   and update_fields <= UNVERSIONED_FIELDS):
+        return
+    recipe_model = apps.get_model('products.Recipe')
+    # Users without recipes, most of them, are shown in no recipe.
+    if not recipe_model.objects.filter(author=instance).exists():
+        return
+    key = AUTHOR_VERSION_KEY.format(id=instance.pk)
+    transaction.on_commit(
+        lambda: get_version_cache().set(key, new_version(), None)
+    )
+    bump_versions(recipe_model)
+
+
+def touch_recipes(ids):
+    """Moves updated_at of recipes whose related rows have changed."""
+    apps.get_model('products.Recipe').objects.filter(id__in=ids).update(
+        updated_at=timezone.now()
+    )
+
+
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    touch_recipes([instance.recipe_id])
+
+
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes([instance.pk])
+    elif pk_set:
+        touch_recipes(pk_set)
+    else:
+        # All recipes of a tag were cleared, their ids are gone.
+        bump_versions(type(instance))
+
+
+def connect_receivers():
+    for label in VERSIONED_MODELS:
+        model = apps.get_model(label)
+        if model._meta.auto_created:
+            m2m_changed.connect(m2m_relation_changed, sender=model)
+        else:
+            post_save.connect(model_changed, sender=model)
+    for label in DELETE_TRACKED_MODELS:
+        post_delete.connect(model_changed, sender=apps.get_model(label))
+    m2m_changed.connect(
+        recipe_tags_changed,
+        sender=apps.get_model('products.Recipe').tags.through
+    )
+    post_save.connect(recipe_ingredient_changed,
+                      sender=apps.get_model('products.RecipeIngredient'))
+    post_save.connect(author_changed,
+                      sender=apps.get_model(settings.AUTH_USER_MODEL))
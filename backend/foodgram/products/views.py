@@ -1,37 +1,113 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.http import HttpResponse
+from django.db.models import BooleanField, Prefetch, Value
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.permissions import (SAFE_METHODS, AllowAny, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle, UserRateThrottle
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
 from users.models import Follow
+from .catalog import get_catalog, get_stats
+from .conditional import ConditionalGetMixin, get_validators
+from .exporters import EXPORTERS
+from .feeds import filter_feed, unfollow_author
 from .filters import IngredientFilter, RecipesFilter
-from .models import FavoriteRecipe, Product, Recipe, ShoppingCart, Tag
-from .pagination import LimitPaginator
-from .pdf_maker import (count_amount_of_all_ingredients_in_cart,
-                        create_list_of_str_of_ingredients, create_pdf)
+from .fragments import SHARED_MODELS, RecipeFragmentMixin
+from .models import (FavoriteRecipe, Product, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListJob, Tag)
+from .pagination import KeysetPagination, LimitPaginator, RecipePaginator
 from .permissions import RecipePermission
+from .renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from .response_cache import AnonymousCacheMixin
+from .response_cache import get_stats as get_response_cache_stats
+from .search import SEARCH_LIMIT, search_catalog
 from .serializers import (FavoriteRecipesSerializer, FollowSerializer,
                           ListFollowersSerializer, ProductSerializer,
-                          RecipeCreateSerializer, RecipeListSerializer,
-                          ShoppingCartSerializer, TagSerializer)
+                          RecipeCreateSerializer, RecipeIdsSerializer,
+                          RecipeListSerializer, ShoppingCartSerializer,
+                          ShoppingListJobSerializer, TagSerializer)
+from .shopping_list import (get_cart_version, get_shopping_list_pdf,
+                            iter_shopping_list)
+from .utils import change_count, get_recipes_limit
+from .versions import (bump_versions, get_author_versions,
+                       get_version_time)
 
 User = get_user_model()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+def add_or_delete_recipes(request, model):
+    serializer = RecipeIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipes = serializer.validated_data['recipes']
+    if request.method == 'POST':
+        model.objects.add(request.user, recipes)
+        serializer = FavoriteRecipesSerializer(recipes, many=True, context={
+            'request': request
+        })
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    model.objects.remove(request.user, recipes)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RecipeViewSet(ConditionalGetMixin,
+                    AnonymousCacheMixin,
+                    RecipeFragmentMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    lookup_value_regex = r'\d+'
     filter_backends = [DjangoFilterBackend]
     filter_class = RecipesFilter
     permission_classes = [RecipePermission]
-    pagination_class = LimitPaginator
+    pagination_class = RecipePaginator
+    # Author profile edits bump Recipe, see versions.author_changed.
+    cache_models = (Recipe, Recipe.tags.through, Tag, RecipeIngredient,
+                    Product)
+    cache_set_params = ('tags',)
+    user_models = (FavoriteRecipe, ShoppingCart, Follow)
+
+    def get_queryset(self):
+        queryset = Recipe.objects.with_user_flags(self.request.user)
+        if self.action in ('list', 'retrieve', 'feed'):
+            # The rest of the recipes comes from the cached fragments.
+            return queryset.only('id', 'author_id', 'pub_date',
+                                 'updated_at')
+        return queryset.with_related()
+
+    def get_cache_models(self):
+        if self.request.query_params.get('ordering') == 'popular':
+            # Favorites move recipes up and down the popular feed.
+            return self.cache_models + (FavoriteRecipe,)
+        return self.cache_models
+
+    def get_validators(self, request):
+        if self.action != 'retrieve':
+            return super().get_validators(request)
+        recipe = Recipe.objects.filter(
+            pk=self.kwargs[self.lookup_field]
+        ).values_list('updated_at', 'author_id').first()
+        if recipe is None:
+            return None, None
+        updated_at, author_id = recipe
+        author_version = get_author_versions([author_id])[author_id]
+        etag, last_modified = get_validators(
+            self.get_validator_models(SHARED_MODELS),
+            updated_at, author_version, request.user.id
+        )
+        return etag, max(last_modified, updated_at.timestamp(),
+                         get_version_time(author_version))
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -41,22 +117,86 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED,
                         headers=headers)
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        # The carts are invalidated before the delete by a pre_delete
+        # receiver, so it has to wait for the commit.
+        with transaction.atomic():
+            instance.delete()
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeListSerializer
         return RecipeCreateSerializer
 
+    @action(detail=False, methods=['GET'],
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Newest recipes of the followed authors, in keyset pages."""
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(
+            filter_feed(self.get_queryset(), request.user), request, self
+        )
+        return paginator.get_paginated_response(self.get_recipes_data(page))
 
-class TagViewSet(mixins.RetrieveModelMixin,
+
+class CatalogMixin:
+    """
+    Serves list and retrieve from the in-memory catalog instead of the
+    database unless CATALOG_CACHE is turned off.
+    """
+    lookup_value_regex = r'\d+'
+
+    def get_catalog_objects(self, catalog):
+        raise NotImplementedError
+
+    def get_catalog_list(self, catalog):
+        return self.get_catalog_objects(catalog).values()
+
+    def list(self, request, *args, **kwargs):
+        if not settings.CATALOG_CACHE:
+            return super().list(request, *args, **kwargs)
+        objects = self.get_catalog_list(get_catalog())
+        return Response(self.get_serializer(objects, many=True).data)
+
+    def get_object(self):
+        if not settings.CATALOG_CACHE:
+            return super().get_object()
+        objects = self.get_catalog_objects(get_catalog())
+        obj = objects.get(int(self.kwargs[self.lookup_field]))
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class TagViewSet(ConditionalGetMixin,
+                 AnonymousCacheMixin,
+                 CatalogMixin,
+                 mixins.RetrieveModelMixin,
                  mixins.ListModelMixin,
                  GenericViewSet):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     permission_classes = [AllowAny]
     pagination_class = None
+    cache_models = (Tag,)
+
+    def get_catalog_objects(self, catalog):
+        return catalog.tags
 
 
-class IngredientViewSet(mixins.RetrieveModelMixin,
+class IngredientViewSet(ConditionalGetMixin,
+                        AnonymousCacheMixin,
+                        CatalogMixin,
+                        mixins.RetrieveModelMixin,
                         mixins.ListModelMixin,
                         GenericViewSet):
     serializer_class = ProductSerializer
@@ -65,6 +205,38 @@ class IngredientViewSet(mixins.RetrieveModelMixin,
     filter_backends = [DjangoFilterBackend]
     filter_class = IngredientFilter
     pagination_class = None
+    cache_models = (Product,)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.query_params.get('name'):
+            return queryset[:SEARCH_LIMIT]
+        return queryset
+
+    def get_catalog_objects(self, catalog):
+        return catalog.products
+
+    def get_catalog_list(self, catalog):
+        name = self.request.query_params.get('name')
+        if name:
+            return search_catalog(name)
+        return super().get_catalog_list(catalog)
+
+
+class CatalogStats(APIView):
+    """Catalog cache hits and misses of the current process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+
+class ResponseCacheStats(APIView):
+    """Anonymous response cache hits and misses of the current process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_response_cache_stats())
 
 
 class FavoriteViewSet(GenericViewSet):
@@ -90,15 +262,16 @@ class FavoriteViewSet(GenericViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            favor_list = get_object_or_404(FavoriteRecipe, user=request.user)
-            if not FavoriteRecipe.objects.filter(user=request.user,
-                                                 recipes=instance).exists():
+            if not FavoriteRecipe.objects.remove(request.user, [instance]):
                 raise ValidationError({
                     'errors': 'Рецепта нет в списке избранного'
                 })
-            favor_list.recipes.remove(instance)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['POST', 'DELETE'], url_path='favorite')
+    def favorite_many(self, request):
+        return add_or_delete_recipes(request, FavoriteRecipe)
+
 
 class FollowViewSet(GenericViewSet):
     queryset = User.objects.all()
@@ -107,7 +280,18 @@ class FollowViewSet(GenericViewSet):
 
     @action(detail=False, methods=['GET'], url_path='subscriptions')
     def get_subscriptions(self, request):
-        followings = get_object_or_404(Follow, user=request.user).author.all()
+        latest_recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            latest_recipes = latest_recipes.latest_per_author(recipes_limit)
+        followings = User.objects.filter(
+            following__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).prefetch_related(
+            Prefetch('recipes', queryset=latest_recipes,
+                     to_attr='latest_recipes')
+        ).order_by('id')
         page = self.paginate_queryset(followings)
         if page is not None:
             serializer = ListFollowersSerializer(page, many=True, context={
@@ -141,13 +325,18 @@ class FollowViewSet(GenericViewSet):
 
         if request.method == 'DELETE':
             author = get_object_or_404(User, id=pk)
-            follow = get_object_or_404(Follow, user=request.user)
-            if not Follow.objects.filter(user=request.user,
-                                         author=author).exists():
+            with transaction.atomic():
+                deleted, _ = Follow.objects.filter(user=request.user,
+                                                   author=author).delete()
+                bump_versions(Follow)
+                if deleted:
+                    change_count(User.objects.filter(id=author.id),
+                                 'followers_count', -1)
+                    unfollow_author(request.user, author)
+            if not deleted:
                 raise ValidationError({
                     'errors': 'Вы не подписаны на этого автора'
                 })
-            follow.author.remove(author)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -174,30 +363,94 @@ class ShoppingCartViewSet(GenericViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            cart = get_object_or_404(ShoppingCart, user=request.user)
-            if not ShoppingCart.objects.filter(user=request.user,
-                                               cart=instance).exists():
+            if not ShoppingCart.objects.remove(request.user, [instance]):
                 raise ValidationError({
                     'errors': 'Рецепта нет в корзине'
                 })
-            cart.cart.remove(instance)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['POST', 'DELETE'],
+            url_path='shopping_cart')
+    def shopping_cart_many(self, request):
+        return add_or_delete_recipes(request, ShoppingCart)
+
 
 class DownloadShoppingList(APIView):
+    """
+    Shopping list in the format picked by the Accept header or ?format=.
+    PDF is the default and is throttled much harder than the others.
+    """
     permission_classes = [IsAuthenticated]
-    throttle_scope = 'low_request'
+    renderer_classes = [PDFRenderer, JSONRenderer, CSVRenderer,
+                        PlainTextRenderer]
+    throttle_classes = [UserRateThrottle, ScopedRateThrottle]
+
+    @property
+    def throttle_scope(self):
+        if self.request.accepted_renderer.format == PDFRenderer.format:
+            return 'low_request'
+        return 'shopping_list'
+
+    def handle_exception(self, exc):
+        self.request.accepted_renderer = JSONRenderer()
+        self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        patch_vary_headers(response, ['Accept'])
+        return response
 
+    @method_decorator(condition(
+        etag_func=lambda request: '{}-{}'.format(
+            get_cart_version(request.user), request.accepted_renderer.format
+        )
+    ))
     def get(self, request):
-        current_user = request.user
-        ingredients = count_amount_of_all_ingredients_in_cart(current_user)
-        ingredients_list = create_list_of_str_of_ingredients(ingredients)
-        pdf = create_pdf(ingredients_list)
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = (
-            'attachment;'
-            'filename="shopping_list.pdf.pdf"'
+        export_format = request.accepted_renderer.format
+        if export_format == PDFRenderer.format:
+            return FileResponse(get_shopping_list_pdf(request.user),
+                                as_attachment=True,
+                                filename='shopping_list.pdf',
+                                content_type=PDFRenderer.media_type)
+        media_type = request.accepted_renderer.media_type
+        response = StreamingHttpResponse(
+            EXPORTERS[export_format](iter_shopping_list(request.user)),
+            content_type=f'{media_type}; charset=utf-8'
         )
-        response.write(pdf)
+        if export_format != JSONRenderer.format:
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_list.{export_format}"'
+            )
         return response
+
+
+class ShoppingListJobViewSet(mixins.CreateModelMixin,
+                             mixins.RetrieveModelMixin,
+                             GenericViewSet):
+    """
+    Renders the shopping list in the background: POST queues a job,
+    GET reports its progress and download links the finished file.
+    """
+    serializer_class = ShoppingListJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ShoppingListJob.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['GET'], url_path='download')
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ShoppingListJob.DONE:
+            raise ValidationError({
+                'errors': 'Список покупок ещё не готов'
+            })
+        return FileResponse(job.file.open('rb'), as_attachment=True,
+                            filename=f'shopping_list.{job.export_format}')
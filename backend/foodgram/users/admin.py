@@ -4,13 +4,14 @@ from .models import Follow, User
 
 
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('email', 'username', 'first_name', 'last_name')
+    list_display = ('email', 'username', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count')
     search_fields = ['username', 'email']
 
 
 class FollowAdmin(admin.ModelAdmin):
-    list_display = ('user',)
-    filter_horizontal = ('author',)
+    list_display = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
 
 
 admin.site.register(User, UserAdmin)
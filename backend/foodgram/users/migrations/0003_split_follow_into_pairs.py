@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def split_into_pairs(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    through = Follow._meta.get_field('author').remote_field.through
+    pairs = set(through.objects.values_list('follow__user', 'user'))
+    Follow.objects.all().delete()
+    Follow.objects.bulk_create(
+        Follow(user_id=user_id, followed_author_id=author_id)
+        for user_id, author_id in pairs
+        if user_id != author_id
+    )
+
+
+def merge_into_containers(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    authors_by_user = defaultdict(list)
+    for user_id, author_id in Follow.objects.values_list('user',
+                                                         'followed_author'):
+        authors_by_user[user_id].append(author_id)
+    Follow.objects.all().delete()
+    for user_id, author_ids in authors_by_user.items():
+        follow = Follow.objects.create(user_id=user_id)
+        follow.author.set(author_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_follow_author_field'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_into_pairs, merge_into_containers),
+    ]
@@ -8,6 +8,12 @@ class User(AbstractUser):
     username = models.CharField(max_length=150, unique=True)
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150)
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -22,15 +28,18 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='follower',
     )
-    author = models.ManyToManyField(
+    author = models.ForeignKey(
         User,
+        on_delete=models.CASCADE,
         related_name='following',
     )
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['user', 'author'],
-                                    name='unique_follow')
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='prevent_self_follow'),
         ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
@@ -32,5 +32,7 @@ class UserSerializer(serializers.ModelSerializer):
             })
         if current_user == obj:
             return True
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(user=current_user.id,
                                      author=obj).exists()
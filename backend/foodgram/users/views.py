@@ -21,7 +21,7 @@ class UserViewSet(DjoserUserViewSet):
         self.request.user.set_password(
             serializer.validated_data["new_password"]
         )
-        self.request.user.save()
+        self.request.user.save(update_fields=['password'])
 
         if settings.PASSWORD_CHANGED_EMAIL_CONFIRMATION:
             context = {"user": self.request.user}